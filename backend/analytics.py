@@ -0,0 +1,284 @@
+"""Offline corridor analytics for capacity planning.
+
+Streams applications, users and likes out of Mongo (or a Parquet export of them)
+in chunks, projecting only the columns each statistic needs, and computes
+corridor supply/demand, fill rates and time-to-match with vectorized pandas.
+Counts and sums are reduced chunk by chunk; for time-to-match, one pass spills
+applications to temporary Parquet files partitioned by corridor pair (A -> B and
+B -> A), which are then read back one pair at a time, so no collection is held
+in memory whole.
+
+    python analytics.py export ./export
+    python analytics.py corridors --from-parquet ./export --output corridors.csv
+
+Point ANALYTICS_MONGO_URL at a secondary or an analytics node to keep the load
+off the primary; reads prefer secondaries either way.
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import typer
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from expiry import ARCHIVE_COLLECTION
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Columns pulled per collection; everything else stays in Mongo
+FIELDS: Dict[str, List[str]] = {
+    "applications": ["id", "user_id", "user_city", "target_city", "amount", "currency",
+                     "created_at", "expires_at", "is_active", "cancelled_at"],
+    "users": ["id", "city", "is_trusted", "likes_count"],
+    "likes": ["target_user_id", "liker_id", "created_at"],
+}
+# Expired applications live in the archive; both feed the applications frame
+SOURCE_COLLECTIONS = {
+    "applications": ["applications", ARCHIVE_COLLECTION],
+    "users": ["users"],
+    "likes": ["likes"],
+}
+CATEGORICAL = ["user_city", "target_city", "currency", "city"]
+
+app = typer.Typer(help="Offline match analytics over Mongo exports")
+
+
+def _frame(rows: List[dict], fields: List[str]) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(rows, columns=fields)
+    for column in CATEGORICAL:
+        if column in frame:
+            frame[column] = frame[column].astype("category")
+    return frame
+
+
+class MongoSource:
+    def __init__(self, mongo_url: str, db_name: str, chunk_size: int, since: Optional[datetime] = None):
+        self.client = MongoClient(mongo_url, readPreference="secondaryPreferred")
+        self.db = self.client[db_name]
+        self.chunk_size = chunk_size
+        self.since = since
+
+    def chunks(self, name: str) -> Iterator[pd.DataFrame]:
+        fields = FIELDS[name]
+        query = {"created_at": {"$gte": self.since}} if self.since and name == "applications" else {}
+        projection = {"_id": 0, **{field: 1 for field in fields}}
+        for collection in SOURCE_COLLECTIONS[name]:
+            rows = []
+            for row in self.db[collection].find(query, projection, batch_size=self.chunk_size):
+                rows.append(row)
+                if len(rows) >= self.chunk_size:
+                    yield _frame(rows, fields)
+                    rows = []
+            if rows:
+                yield _frame(rows, fields)
+
+    def close(self):
+        self.client.close()
+
+
+class ParquetSource:
+    """Reads the part files written by `export`, one chunk per file"""
+
+    def __init__(self, directory: Path, since: Optional[datetime] = None):
+        self.directory = directory
+        self.since = since
+
+    def chunks(self, name: str) -> Iterator[pd.DataFrame]:
+        for part in sorted((self.directory / name).glob("part-*.parquet")):
+            frame = pd.read_parquet(part, columns=FIELDS[name])
+            if self.since is not None and name == "applications":
+                frame = frame[frame["created_at"] >= self.since]
+            yield frame
+
+    def close(self):
+        pass
+
+
+def likes_received(source) -> pd.Series:
+    """Likes per user, reduced chunk by chunk"""
+    total = pd.Series(dtype="float64")
+    for chunk in source.chunks("likes"):
+        total = total.add(chunk["target_user_id"].value_counts(), fill_value=0)
+    return total
+
+
+def trusted_users(source) -> Set[str]:
+    """Ids of trusted users, reduced chunk by chunk; untrusted users are never kept"""
+    trusted: Set[str] = set()
+    for chunk in source.chunks("users"):
+        trusted.update(chunk.loc[chunk["is_trusted"].fillna(False).astype(bool), "id"])
+    return trusted
+
+
+def corridor_totals(source, now: datetime, trusted: Set[str], likes: pd.Series) -> pd.DataFrame:
+    """Per-corridor counts and sums, reduced chunk by chunk"""
+    total: Optional[pd.DataFrame] = None
+    for chunk in source.chunks("applications"):
+        part = pd.DataFrame({
+            "user_city": chunk["user_city"].astype(str),
+            "target_city": chunk["target_city"].astype(str),
+            "demand": 1,
+            "live": chunk["is_active"].fillna(False).astype(bool) & (chunk["expires_at"] > now),
+            "amount": chunk["amount"],
+            "trusted": chunk["user_id"].isin(trusted),
+            "likes": chunk["user_id"].map(likes).fillna(0),
+        }).groupby(["user_city", "target_city"]).sum()
+        total = part if total is None else total.add(part, fill_value=0)
+    return pd.DataFrame() if total is None else total
+
+
+def corridor_match_times(source, corridors: List[Tuple[str, str]], now: datetime) -> pd.DataFrame:
+    """Matched count, median and p90 hours-to-match per corridor, one corridor pair in memory at a time"""
+    pair_ids = {pair: i for i, pair in enumerate(sorted({tuple(sorted(corridor)) for corridor in corridors}))}
+    results = []
+    with tempfile.TemporaryDirectory(prefix="corridor-pairs-") as spill:
+        # One pass over the collections, spilling each chunk's rows into its pair's partition
+        for chunk in source.chunks("applications"):
+            apps = pd.DataFrame({
+                "user_city": chunk["user_city"].astype(str),
+                "target_city": chunk["target_city"].astype(str),
+                # Chunks with no cancellations carry an all-None column; keep every file's schema the same
+                **{column: pd.to_datetime(chunk[column]).astype("datetime64[ns]")
+                   for column in ("created_at", "expires_at", "cancelled_at")},
+            })
+            pair = pd.Series(list(zip(
+                np.minimum(apps["user_city"], apps["target_city"]),
+                np.maximum(apps["user_city"], apps["target_city"]),
+            )), index=apps.index, dtype=object)
+            apps["pair_id"] = pair.map(pair_ids)
+            apps = apps[apps["pair_id"].notna()].astype({"pair_id": int})
+            if not apps.empty:
+                apps.to_parquet(spill, partition_cols=["pair_id"], index=False)
+
+        for pair_id in pair_ids.values():
+            partition = Path(spill) / f"pair_id={pair_id}"
+            if not partition.exists():
+                continue
+            apps = pd.read_parquet(partition)
+            apps["end_at"] = apps["cancelled_at"].fillna(apps["expires_at"]).clip(upper=pd.Timestamp(now))
+            apps["hours_to_match"] = time_to_match(apps) / np.timedelta64(1, "h")
+            grouped = apps.groupby(["user_city", "target_city"])["hours_to_match"]
+            results.append(pd.DataFrame({
+                "matched": grouped.count(),
+                "median_hours_to_match": grouped.median(),
+                "p90_hours_to_match": grouped.quantile(0.9),
+            }))
+    if not results:
+        return pd.DataFrame(columns=["matched", "median_hours_to_match", "p90_hours_to_match"])
+    return pd.concat(results)
+
+
+def time_to_match(apps: pd.DataFrame) -> pd.Series:
+    """Time until a counterparty in the reverse corridor was live, per application.
+
+    Zero when one was already live at creation, NaT when none appeared before the
+    application ended. Only the latest earlier counterparty is checked for liveness.
+    """
+    apps = apps.sort_values("created_at")
+    left = apps[["created_at", "user_city", "target_city"]].reset_index()
+    # The counterparty corridor of (A -> B) is (B -> A): swap the keys on the right side
+    right = apps.rename(columns={
+        "user_city": "target_city", "target_city": "user_city",
+        "created_at": "cp_created_at", "end_at": "cp_end_at",
+    })[["cp_created_at", "cp_end_at", "user_city", "target_city"]]
+    for column in ("user_city", "target_city"):
+        left[column] = left[column].astype(str)
+        right[column] = right[column].astype(str)
+
+    merge = dict(left_on="created_at", right_on="cp_created_at", by=["user_city", "target_city"])
+    earlier = pd.merge_asof(left, right, direction="backward", **merge).set_index("index")
+    later = pd.merge_asof(left, right, direction="forward", allow_exact_matches=False, **merge).set_index("index")
+
+    wait = later["cp_created_at"] - later["created_at"]
+    already_live = earlier["cp_end_at"] > earlier["created_at"]
+    wait = wait.where(~already_live, pd.Timedelta(0))
+    return wait.where(wait.notna() & (apps["created_at"] + wait < apps["end_at"]))
+
+
+def corridor_stats(source, now: Optional[datetime] = None) -> pd.DataFrame:
+    now = now or datetime.utcnow()
+    totals = corridor_totals(source, now, trusted_users(source), likes_received(source))
+    if totals.empty:
+        return pd.DataFrame()
+    times = corridor_match_times(source, list(totals.index), now).reindex(totals.index)
+
+    demand = totals["demand"].astype(int)
+    stats = pd.DataFrame({
+        "demand": demand,
+        "live": totals["live"].astype(int),
+        "fill_rate": times["matched"].fillna(0) / demand,
+        "median_hours_to_match": times["median_hours_to_match"],
+        "p90_hours_to_match": times["p90_hours_to_match"],
+        "mean_amount": totals["amount"] / demand,
+        "trusted_share": totals["trusted"] / demand,
+        "mean_likes": totals["likes"] / demand,
+    })
+    # Supply for (A -> B) is the demand of the reverse corridor (B -> A)
+    reverse = stats["demand"].rename_axis(["target_city", "user_city"]).reorder_levels(["user_city", "target_city"])
+    stats["supply"] = reverse.reindex(stats.index).fillna(0).astype(int).values
+    stats["supply_demand_ratio"] = stats["supply"] / stats["demand"]
+    return stats.sort_values("demand", ascending=False)
+
+
+def _source(from_parquet: Optional[Path], chunk_size: int, since_days: Optional[int]):
+    since = datetime.utcnow() - timedelta(days=since_days) if since_days else None
+    if from_parquet is not None:
+        return ParquetSource(from_parquet, since)
+    mongo_url = os.environ.get('ANALYTICS_MONGO_URL') or os.environ['MONGO_URL']
+    return MongoSource(mongo_url, os.environ['DB_NAME'], chunk_size, since)
+
+
+@app.command()
+def export(
+    out_dir: Path = typer.Argument(..., help="Directory to write <collection>/part-NNNNN.parquet files to"),
+    chunk_size: int = typer.Option(50000, help="Documents per part file"),
+    since_days: Optional[int] = typer.Option(None, help="Only applications created in the last N days"),
+):
+    """Stream applications, users and likes out of Mongo into Parquet part files"""
+    source = _source(None, chunk_size, since_days)
+    try:
+        for name in FIELDS:
+            target = out_dir / name
+            target.mkdir(parents=True, exist_ok=True)
+            rows = 0
+            for i, chunk in enumerate(source.chunks(name)):
+                chunk.to_parquet(target / f"part-{i:05d}.parquet", index=False)
+                rows += len(chunk)
+            typer.echo(f"{name}: {rows} rows")
+    finally:
+        source.close()
+
+
+@app.command()
+def corridors(
+    from_parquet: Optional[Path] = typer.Option(None, help="Read a previous export instead of Mongo"),
+    chunk_size: int = typer.Option(50000, help="Documents per chunk when reading Mongo"),
+    since_days: Optional[int] = typer.Option(None, help="Only applications created in the last N days"),
+    top: int = typer.Option(20, help="Corridors to print"),
+    output: Optional[Path] = typer.Option(None, help="Write every corridor to a .csv or .parquet file"),
+):
+    """Corridor supply/demand, fill rate and time-to-match"""
+    source = _source(from_parquet, chunk_size, since_days)
+    try:
+        stats = corridor_stats(source)
+    finally:
+        source.close()
+    if stats.empty:
+        typer.echo("No applications")
+        raise typer.Exit()
+    typer.echo(stats.head(top).round(2).to_string())
+    if output is not None:
+        if output.suffix == ".parquet":
+            stats.reset_index().to_parquet(output, index=False)
+        else:
+            stats.to_csv(output)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,230 @@
+import difflib
+import hashlib
+import json
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from functools import cached_property
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+# Neighbour tables are precomputed up to this distance
+MAX_RADIUS_KM = 1000.0
+
+
+class City(NamedTuple):
+    id: int
+    name: str
+    country: str
+    lat: float
+    lon: float
+
+
+# World cities data (major cities with 1M+ population + capitals)
+# The row index is the canonical city id: append new cities at the end
+_CITY_ROWS = [
+    ("Addis Ababa", "Ethiopia", 9.03, 38.74),
+    ("Adelaide", "Australia", -34.93, 138.60),
+    ("Ahmedabad", "India", 23.02, 72.57),
+    ("Alexandria", "Egypt", 31.20, 29.92),
+    ("Algiers", "Algeria", 36.75, 3.06),
+    ("Almaty", "Kazakhstan", 43.24, 76.89),
+    ("Amsterdam", "Netherlands", 52.37, 4.90),
+    ("Ankara", "Turkey", 39.93, 32.86),
+    ("Athens", "Greece", 37.98, 23.73),
+    ("Atlanta", "USA", 33.75, -84.39),
+    ("Auckland", "New Zealand", -36.85, 174.76),
+    ("Baghdad", "Iraq", 33.31, 44.37),
+    ("Baku", "Azerbaijan", 40.41, 49.87),
+    ("Bangkok", "Thailand", 13.76, 100.50),
+    ("Barcelona", "Spain", 41.39, 2.17),
+    ("Beijing", "China", 39.90, 116.41),
+    ("Belgrade", "Serbia", 44.79, 20.45),
+    ("Berlin", "Germany", 52.52, 13.40),
+    ("Birmingham", "United Kingdom", 52.49, -1.89),
+    ("Bogotá", "Colombia", 4.71, -74.07),
+    ("Boston", "USA", 42.36, -71.06),
+    ("Brisbane", "Australia", -27.47, 153.03),
+    ("Brussels", "Belgium", 50.85, 4.35),
+    ("Bucharest", "Romania", 44.43, 26.10),
+    ("Budapest", "Hungary", 47.50, 19.04),
+    ("Buenos Aires", "Argentina", -34.60, -58.38),
+    ("Cairo", "Egypt", 30.04, 31.24),
+    ("Calgary", "Canada", 51.05, -114.07),
+    ("Cape Town", "South Africa", -33.92, 18.42),
+    ("Caracas", "Venezuela", 10.48, -66.90),
+    ("Casablanca", "Morocco", 33.57, -7.59),
+    ("Chennai", "India", 13.08, 80.27),
+    ("Chicago", "USA", 41.88, -87.63),
+    ("Cologne", "Germany", 50.94, 6.96),
+    ("Copenhagen", "Denmark", 55.68, 12.57),
+    ("Dallas", "USA", 32.78, -96.80),
+    ("Damascus", "Syria", 33.51, 36.29),
+    ("Delhi", "India", 28.70, 77.10),
+    ("Detroit", "USA", 42.33, -83.05),
+    ("Dhaka", "Bangladesh", 23.81, 90.41),
+    ("Dubai", "United Arab Emirates", 25.20, 55.27),
+    ("Dublin", "Ireland", 53.35, -6.26),
+    ("Düsseldorf", "Germany", 51.23, 6.77),
+    ("Edinburgh", "United Kingdom", 55.95, -3.19),
+    ("Frankfurt", "Germany", 50.11, 8.68),
+    ("Geneva", "Switzerland", 46.20, 6.14),
+    ("Glasgow", "United Kingdom", 55.86, -4.25),
+    ("Guadalajara", "Mexico", 20.66, -103.35),
+    ("Hamburg", "Germany", 53.55, 9.99),
+    ("Helsinki", "Finland", 60.17, 24.94),
+    ("Ho Chi Minh City", "Vietnam", 10.82, 106.63),
+    ("Hong Kong", "China", 22.32, 114.17),
+    ("Houston", "USA", 29.76, -95.37),
+    ("Istanbul", "Turkey", 41.01, 28.98),
+    ("Jakarta", "Indonesia", -6.21, 106.85),
+    ("Johannesburg", "South Africa", -26.20, 28.05),
+    ("Karachi", "Pakistan", 24.86, 67.01),
+    ("Kiev", "Ukraine", 50.45, 30.52),
+    ("Kuala Lumpur", "Malaysia", 3.14, 101.69),
+    ("Lagos", "Nigeria", 6.52, 3.38),
+    ("Lahore", "Pakistan", 31.55, 74.34),
+    ("Lima", "Peru", -12.05, -77.04),
+    ("Lisbon", "Portugal", 38.72, -9.14),
+    ("London", "United Kingdom", 51.51, -0.13),
+    ("Los Angeles", "USA", 34.05, -118.24),
+    ("Lyon", "France", 45.76, 4.84),
+    ("Madrid", "Spain", 40.42, -3.70),
+    ("Manchester", "United Kingdom", 53.48, -2.24),
+    ("Manila", "Philippines", 14.60, 120.98),
+    ("Melbourne", "Australia", -37.81, 144.96),
+    ("Mexico City", "Mexico", 19.43, -99.13),
+    ("Miami", "USA", 25.76, -80.19),
+    ("Milan", "Italy", 45.46, 9.19),
+    ("Minneapolis", "USA", 44.98, -93.27),
+    ("Montreal", "Canada", 45.50, -73.57),
+    ("Moscow", "Russia", 55.76, 37.62),
+    ("Mumbai", "India", 19.08, 72.88),
+    ("Munich", "Germany", 48.14, 11.58),
+    ("Nairobi", "Kenya", -1.29, 36.82),
+    ("New York", "USA", 40.71, -74.01),
+    ("Oslo", "Norway", 59.91, 10.75),
+    ("Paris", "France", 48.86, 2.35),
+    ("Perth", "Australia", -31.95, 115.86),
+    ("Philadelphia", "USA", 39.95, -75.17),
+    ("Phoenix", "USA", 33.45, -112.07),
+    ("Prague", "Czech Republic", 50.08, 14.44),
+    ("Riyadh", "Saudi Arabia", 24.71, 46.68),
+    ("Rome", "Italy", 41.90, 12.50),
+    ("San Francisco", "USA", 37.77, -122.42),
+    ("Santiago", "Chile", -33.45, -70.67),
+    ("São Paulo", "Brazil", -23.55, -46.63),
+    ("Seoul", "South Korea", 37.57, 126.98),
+    ("Shanghai", "China", 31.23, 121.47),
+    ("Singapore", "Singapore", 1.35, 103.82),
+    ("Stockholm", "Sweden", 59.33, 18.07),
+    ("Sydney", "Australia", -33.87, 151.21),
+    ("Taipei", "Taiwan", 25.03, 121.57),
+    ("Tehran", "Iran", 35.69, 51.39),
+    ("Tel Aviv", "Israel", 32.09, 34.78),
+    ("Tokyo", "Japan", 35.68, 139.69),
+    ("Toronto", "Canada", 43.65, -79.38),
+    ("Vancouver", "Canada", 49.28, -123.12),
+    ("Vienna", "Austria", 48.21, 16.37),
+    ("Warsaw", "Poland", 52.23, 21.01),
+    ("Washington", "USA", 38.91, -77.04),
+    ("Zurich", "Switzerland", 47.38, 8.54),
+]
+
+
+def fold(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation: 'São Paulo' -> 'sao paulo'"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.split(r"[\W_]+", text.casefold())).strip()
+
+
+def haversine_km(a: City, b: City) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (a.lat, a.lon, b.lat, b.lon))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+class CityCatalog:
+    """City lookup tables built once at import; the neighbour table on first use."""
+
+    def __init__(self, cities: List[City]):
+        self.cities = cities
+        self.by_key: Dict[str, City] = {fold(city.name): city for city in cities}
+        # Sorted (key, city id) pairs for the full name and every word suffix,
+        # so "york" finds "New York" with the same bisect as "new y"
+        self.prefix_index = sorted(
+            (" ".join(words[i:]), city.id)
+            for city in cities
+            for words in [fold(city.name).split()]
+            for i in range(len(words))
+        )
+        self.prefix_keys = [key for key, _ in self.prefix_index]
+        self.names = sorted(city.name for city in cities)
+        self.listing = json.dumps({"cities": self.names}, ensure_ascii=False).encode()
+        self.etag = '"' + hashlib.sha1(self.listing).hexdigest() + '"'
+
+    @cached_property
+    def neighbors(self) -> List[List[Tuple[float, int]]]:
+        """For each city, (distance_km, city id) of every city within MAX_RADIUS_KM, nearest first.
+
+        The catalog is small, so a full neighbour table beats a tree at query time.
+        Built on the first radius search rather than at import.
+        """
+        return [
+            sorted(
+                (distance, other.id)
+                for other in self.cities
+                for distance in [haversine_km(city, other)]
+                if distance <= MAX_RADIUS_KM
+            )
+            for city in self.cities
+        ]
+
+    def __contains__(self, name: str) -> bool:
+        return self.resolve(name) is not None
+
+    def resolve(self, name: str) -> Optional[City]:
+        return self.by_key.get(fold(name))
+
+    def canonical(self, name: str) -> str:
+        """The catalog spelling of name, or name itself when it isn't a catalog city"""
+        city = self.resolve(name)
+        return city.name if city else name
+
+    def nearby(self, name: str, radius_km: float) -> Dict[str, float]:
+        """Catalog cities within radius_km of name (itself included), mapped to their distance"""
+        city = self.resolve(name)
+        if city is None:
+            return {name: 0.0}
+        result = {}
+        for distance, city_id in self.neighbors[city.id]:
+            if distance > radius_km:
+                break
+            result[self.cities[city_id].name] = round(distance, 1)
+        return result
+
+    def search(self, query: str, limit: int = 10) -> List[City]:
+        key = fold(query)
+        if not key:
+            return []
+
+        found: Dict[int, City] = {}
+        start = bisect_left(self.prefix_keys, key)
+        for prefix_key, city_id in self.prefix_index[start:]:
+            if not prefix_key.startswith(key) or len(found) >= limit:
+                break
+            found.setdefault(city_id, self.cities[city_id])
+
+        # Fall back to fuzzy matching for typos
+        if len(found) < limit:
+            for close in difflib.get_close_matches(key, self.by_key, n=limit, cutoff=0.75):
+                city = self.by_key[close]
+                found.setdefault(city.id, city)
+        return list(found.values())[:limit]
+
+
+CITIES = [City(i, name, country, lat, lon) for i, (name, country, lat, lon) in enumerate(_CITY_ROWS)]
+WORLD_CITIES = [city.name for city in CITIES]
+city_catalog = CityCatalog(CITIES)
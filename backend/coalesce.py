@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from shared_cache import SharedCache
+
+
+class Coalescer:
+    """Single-flight execution of idempotent reads, backed by a shared micro-cache.
+
+    Concurrent callers with the same key share one computation; callers within
+    ttl seconds afterwards get the cached result.
+    """
+
+    def __init__(self, cache: SharedCache):
+        self.cache = cache
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        result = await compute()
+        if ttl > 0:
+            await self.cache.set(key, result, ttl)
+        return result
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: float = 1.0) -> Any:
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, compute, ttl))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # Shielded so one caller disconnecting doesn't cancel the work for the rest
+        return await asyncio.shield(task)
+
+
+def cache_key(name: str, **params) -> str:
+    """Normalized key: parameter order and None-valued parameters don't matter"""
+    return name + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
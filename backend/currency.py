@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    import httpx
+    import numpy as np
+
+from metrics import note
+
+logger = logging.getLogger(__name__)
+
+# Free ExchangeRate-API; override with api_url (CURRENCY_API_URL, e.g. a local stub in tests)
+DEFAULT_CURRENCY_API_URL = "https://api.exchangerate-api.com/v4/latest/{base}"
+
+
+class CurrencyService:
+    """Exchange rates from one canonical upstream table; other bases are derived by cross rates."""
+
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        canonical_base: str = 'USD',
+        cache_duration: timedelta = timedelta(hours=1),
+        refresh_margin: timedelta = timedelta(minutes=10),
+        max_derived: int = 64,
+        timeout: float = 10.0,
+        shared=None,
+    ):
+        self.api_url = api_url or DEFAULT_CURRENCY_API_URL
+        self.canonical_base = canonical_base
+        self.cache_duration = cache_duration
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        # Optional SharedCache: workers reuse each other's upstream fetches
+        self.shared = shared
+        # (fetched_at, upstream payload) for canonical_base
+        self.table: Optional[Tuple[datetime, Dict]] = None
+        # LRU of derived tables, dropped whenever the canonical table changes
+        self.derived: "OrderedDict[str, Dict]" = OrderedDict()
+        self.max_derived = max_derived
+        self.inflight: Optional[asyncio.Task] = None
+        self.http: Optional["httpx.AsyncClient"] = None
+        self.refresh_task: Optional[asyncio.Task] = None
+        # Requests served from the cached canonical table vs. ones that had to wait on upstream
+        self.hits = 0
+        self.misses = 0
+
+    def _client(self) -> "httpx.AsyncClient":
+        # One pooled client for the life of the process; httpx is only imported once rates are needed
+        import httpx
+        if self.http is None:
+            self.http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self.http
+
+    def _shared_key(self) -> str:
+        return f"currency:{self.canonical_base}"
+
+    async def _fetch(self) -> Dict:
+        if self.shared is not None:
+            entry = await self.shared.get(self._shared_key())
+            if entry is not None:
+                fetched_at = datetime.fromisoformat(entry['fetched_at'])
+                if not self._is_due(fetched_at, datetime.utcnow()):
+                    self._store(fetched_at, entry['data'])
+                    return entry['data']
+
+        note("currency_fetch")
+        response = await self._client().get(self.api_url.format(base=self.canonical_base))
+        response.raise_for_status()
+        data = response.json()
+        if 'rates' not in data:
+            raise ValueError("Invalid API response format")
+        fetched_at = datetime.utcnow()
+        self._store(fetched_at, data)
+        if self.shared is not None:
+            await self.shared.set(
+                self._shared_key(),
+                {'fetched_at': fetched_at.isoformat(), 'data': data},
+                self.cache_duration.total_seconds()
+            )
+        return data
+
+    def _store(self, fetched_at: datetime, data: Dict):
+        self.table = (fetched_at, data)
+        self.derived.clear()
+
+    def _done(self, task: asyncio.Task):
+        self.inflight = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Exchange rate refresh failed: {task.exception()}")
+
+    def _refresh(self) -> asyncio.Task:
+        """Start a fetch of the canonical table, or join the one already in flight."""
+        if self.inflight is None:
+            self.inflight = asyncio.create_task(self._fetch())
+            self.inflight.add_done_callback(self._done)
+        return self.inflight
+
+    def _is_due(self, fetched_at: datetime, now: datetime) -> bool:
+        return now - fetched_at >= self.cache_duration - self.refresh_margin
+
+    async def _canonical(self) -> Dict:
+        now = datetime.utcnow()
+        if self.table:
+            fetched_at, data = self.table
+            if now - fetched_at < self.cache_duration:
+                self.hits += 1
+                # Refresh ahead of expiry without making this request wait
+                if self._is_due(fetched_at, now):
+                    self._refresh()
+                return data
+
+        self.misses += 1
+        import httpx
+        try:
+            return await asyncio.shield(self._refresh())
+        except (httpx.HTTPError, ValueError) as e:
+            if self.table:
+                logger.warning(f"Serving stale exchange rates: {e}")
+                return self.table[1]
+            raise Exception(f"Failed to fetch exchange rates: {str(e)}")
+
+    def _derive(self, data: Dict, base_currency: str) -> Dict:
+        if base_currency == self.canonical_base:
+            return data
+        if base_currency in self.derived:
+            self.derived.move_to_end(base_currency)
+            return self.derived[base_currency]
+
+        rates = data['rates']
+        if base_currency not in rates:
+            raise ValueError(f"Unsupported currency: {base_currency}")
+        base_rate = rates[base_currency]
+        derived = {
+            **data,
+            'base': base_currency,
+            'rates': {code: rate / base_rate for code, rate in rates.items()},
+        }
+        self.derived[base_currency] = derived
+        if len(self.derived) > self.max_derived:
+            self.derived.popitem(last=False)
+        return derived
+
+    async def get_exchange_rates(self, base_currency: str = 'USD') -> Dict:
+        data = await self._canonical()
+        return self._derive(data, base_currency)
+
+    async def convert(
+        self,
+        amounts: Union[Sequence[float], "np.ndarray"],
+        from_currency: Union[str, Sequence[str]],
+        to_currency: str,
+    ) -> "np.ndarray":
+        """Convert many amounts at once.
+
+        from_currency is either one code for all amounts or one code per amount.
+        """
+        import numpy as np
+        rates = (await self._canonical())['rates']
+        amounts = np.asarray(amounts, dtype=float)
+        try:
+            if isinstance(from_currency, str):
+                from_rates = rates[from_currency]
+            else:
+                from_rates = np.fromiter((rates[code] for code in from_currency), dtype=float, count=len(amounts))
+            to_rate = rates[to_currency]
+        except KeyError as e:
+            raise ValueError(f"Unsupported currency: {e.args[0]}")
+        return amounts / from_rates * to_rate
+
+    async def _refresh_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            if self.table is None or self._is_due(self.table[0], datetime.utcnow()):
+                try:
+                    await self._refresh()
+                except Exception:
+                    pass  # already logged by _done; retried on the next tick
+
+    def start(self, interval: float = 60.0):
+        if self.refresh_task is None:
+            self.refresh_task = asyncio.create_task(self._refresh_loop(interval))
+
+    async def close(self):
+        if self.refresh_task is not None:
+            self.refresh_task.cancel()
+            self.refresh_task = None
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
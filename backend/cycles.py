@@ -0,0 +1,101 @@
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set
+
+from order_book import OrderBook
+
+# Longest cycle proposed (A -> B -> C -> D -> A); two-party swaps are plain search results
+MAX_CYCLE_LENGTH = 4
+# Bounds per lookup, so cost does not grow with the size of the book
+MAX_CITY_PATHS = 50
+LEG_SCAN_LIMIT = 200
+
+
+def _city_paths(book: OrderBook, origin: str, destination: str, max_length: int) -> Iterator[List[str]]:
+    """City paths origin -> ... -> destination of 2 to max_length - 1 hops, shortest first.
+
+    Each path closes a cycle with the seed corridor destination -> origin.
+    """
+    closers = book.predecessors.get(destination, set())
+    frontier = [[origin]]
+    for hops in range(2, max_length):
+        extended = []
+        for path in frontier:
+            for city in book.successors.get(path[-1], ()):
+                if city == destination or city in path:
+                    continue
+                extended.append(path + [city])
+        for path in extended:
+            if path[-1] in closers:
+                yield path + [destination]
+        frontier = extended
+
+
+def usd_value(app: dict, usd_rates: Optional[Dict[str, float]]) -> Optional[float]:
+    currency = app.get("currency", "USD")
+    if currency == "USD":
+        return app["amount"]
+    if usd_rates and usd_rates.get(currency):
+        return app["amount"] / usd_rates[currency]
+    return None
+
+
+def _best_leg(
+    book: OrderBook,
+    user_city: str,
+    target_city: str,
+    target_value: float,
+    tolerance: float,
+    excluded_users: Set[str],
+    usd_rates: Optional[Dict[str, float]],
+    now: datetime,
+) -> Optional[dict]:
+    """The newest-first scan's application closest in amount to target_value, within tolerance"""
+    best, best_gap = None, tolerance
+    for app in islice(book.iter_corridor((user_city, target_city)), LEG_SCAN_LIMIT):
+        if app["user_id"] in excluded_users or app["expires_at"] <= now:
+            continue
+        value = usd_value(app, usd_rates)
+        if value is None:
+            continue
+        gap = abs(value - target_value) / target_value
+        if gap <= best_gap:
+            best, best_gap = app, gap
+    return best
+
+
+def find_cycles(
+    book: OrderBook,
+    seed: dict,
+    max_length: int = MAX_CYCLE_LENGTH,
+    tolerance: float = 0.2,
+    limit: int = 10,
+    usd_rates: Optional[Dict[str, float]] = None,
+    now: Optional[datetime] = None,
+) -> List[List[dict]]:
+    """Propose match groups that close a cycle through the seed application's corridor.
+
+    Every leg's amount is within tolerance of the seed's (compared in USD when
+    usd_rates, units per USD, is given) and every leg belongs to a different user.
+    Returns groups of applications starting with the seed, shortest cycles first.
+    """
+    now = now or datetime.utcnow()
+    seed_value = usd_value(seed, usd_rates)
+    if seed_value is None or seed_value <= 0:
+        return []
+
+    groups = []
+    for path in islice(_city_paths(book, seed["target_city"], seed["user_city"], max_length), MAX_CITY_PATHS):
+        group = [seed]
+        users = {seed["user_id"]}
+        for user_city, target_city in zip(path, path[1:]):
+            leg = _best_leg(book, user_city, target_city, seed_value, tolerance, users, usd_rates, now)
+            if leg is None:
+                break
+            group.append(leg)
+            users.add(leg["user_id"])
+        else:
+            groups.append(group)
+            if len(groups) >= limit:
+                break
+    return groups
@@ -0,0 +1,92 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "applications_archive"
+# A claimed batch is archived within seconds; one claimed longer ago than this was left by a crashed sweep
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+async def _archive(db, applications: List[dict], now: datetime):
+    if not applications:
+        return
+    archived = [{**app, "is_active": False, "archived_at": now} for app in applications]
+    for app in archived:
+        app.pop("swept_by", None)
+        app.pop("swept_at", None)
+    try:
+        await db[ARCHIVE_COLLECTION].insert_many(archived, ordered=False)
+    except BulkWriteError as e:
+        # Rows already archived by an earlier, interrupted sweep are fine
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+
+async def recover_interrupted(db, now: Optional[datetime] = None, timeout: timedelta = CLAIM_TIMEOUT) -> int:
+    """Finish moving applications that a crashed sweep deactivated but did not archive.
+
+    Claims younger than timeout belong to a sweep that may still be running and are left alone.
+    """
+    now = now or datetime.utcnow()
+    leftovers = await db.applications.find({
+        "swept_by": {"$exists": True},
+        # Claims made before claim times were recorded have no swept_at
+        "$or": [{"swept_at": {"$lte": now - timeout}}, {"swept_at": {"$exists": False}}],
+    }, {"_id": 0}).to_list(None)
+    await _archive(db, leftovers, now)
+    if leftovers:
+        await db.applications.delete_many({"id": {"$in": [app["id"] for app in leftovers]}})
+    return len(leftovers)
+
+
+async def _sweep(db, query: dict, now: datetime, batch_size: int) -> List[dict]:
+    """Move applications matching query to the archive in batches.
+
+    Each batch is claimed with a unique sweep id first, so concurrent sweepers in other
+    workers never report the same application. Returns the applications this call moved.
+    """
+    moved = []
+    while True:
+        candidates = await db.applications.find(query, {"_id": 0, "id": 1}).limit(batch_size).to_list(batch_size)
+        if not candidates:
+            break
+
+        sweep_id = str(uuid.uuid4())
+        await db.applications.update_many(
+            {"id": {"$in": [app["id"] for app in candidates]}, **query},
+            {"$set": {"is_active": False, "swept_by": sweep_id, "swept_at": now}}
+        )
+        claimed = await db.applications.find({"swept_by": sweep_id}, {"_id": 0}).to_list(None)
+        await _archive(db, claimed, now)
+        await db.applications.delete_many({"swept_by": sweep_id})
+
+        for app in claimed:
+            app.pop("swept_by", None)
+            app.pop("swept_at", None)
+            app["is_active"] = False
+        moved.extend(claimed)
+    return moved
+
+
+async def sweep_expired(db, now: Optional[datetime] = None, batch_size: int = 500) -> List[dict]:
+    """Deactivate expired applications and move them to the archive collection"""
+    now = now or datetime.utcnow()
+    expired = await _sweep(db, {"is_active": True, "expires_at": {"$lte": now}}, now, batch_size)
+    if expired:
+        logger.info(f"Archived {len(expired)} expired applications")
+    return expired
+
+
+async def archive_cancelled(db, now: Optional[datetime] = None, batch_size: int = 500) -> List[dict]:
+    now = now or datetime.utcnow()
+    cancelled = await _sweep(
+        db, {"cancelled_at": {"$exists": True}, "swept_by": {"$exists": False}}, now, batch_size
+    )
+    if cancelled:
+        logger.info(f"Archived {len(cancelled)} cancelled applications")
+    return cancelled
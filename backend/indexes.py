@@ -0,0 +1,132 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Declarative index registry, applied idempotently on startup
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "user_passwords": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "likes": [
+        IndexModel(
+            [("target_user_id", ASCENDING), ("liker_id", ASCENDING)],
+            name="target_liker_unique",
+            unique=True,
+        ),
+    ],
+    "comments": [
+        IndexModel(
+            [("target_user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="target_created_id",
+        ),
+    ],
+    "applications": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="user_created_id",
+        ),
+        # Only live applications are searched, so expired/cancelled ones stay out of the index
+        IndexModel(
+            [("user_city", ASCENDING), ("target_city", ASCENDING), ("expires_at", ASCENDING)],
+            name="active_corridor",
+            partialFilterExpression={"is_active": True},
+        ),
+        IndexModel(
+            [("expires_at", ASCENDING)],
+            name="active_expiry",
+            partialFilterExpression={"is_active": True},
+        ),
+        # Set only while the expiry sweeper is moving a batch to the archive
+        IndexModel([("swept_by", ASCENDING)], name="swept_by", sparse=True),
+        IndexModel([("cancelled_at", ASCENDING)], name="cancelled_at", sparse=True),
+    ],
+    "profiles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    # Shared cache entries and rate limit buckets clean themselves up
+    "shared_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "rate_limits": [
+        IndexModel([("updated_at", ASCENDING)], name="updated_at_ttl", expireAfterSeconds=3600),
+    ],
+    "applications_archive": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="user_created_id",
+        ),
+    ],
+}
+
+
+def query_shapes() -> List[Tuple[str, dict]]:
+    """Every filter shape the API router issues, with placeholder values"""
+    now = datetime.utcnow()
+    return [
+        ("users", {"email": "probe@example.com"}),
+        ("users", {"id": "probe"}),
+        ("users", {"id": {"$in": ["probe-1", "probe-2"]}}),
+        ("user_passwords", {"user_id": "probe"}),
+        ("likes", {"target_user_id": "probe", "liker_id": "probe"}),
+        ("likes", {"target_user_id": "probe"}),
+        ("comments", {"target_user_id": "probe"}),
+        ("profiles", {"user_id": "probe"}),
+        ("profiles", {"user_id": {"$in": ["probe-1", "probe-2"]}}),
+        ("applications", {"user_id": "probe"}),
+        ("applications_archive", {"user_id": "probe"}),
+        ("applications", {"is_active": True, "expires_at": {"$gt": now}}),
+        ("applications", {"is_active": True, "expires_at": {"$lte": now}}),
+        ("applications", {"swept_by": "probe"}),
+        ("applications", {"cancelled_at": {"$exists": True}, "swept_by": {"$exists": False}}),
+        ("applications", {"id": {"$in": ["probe-1", "probe-2"]}, "user_id": "probe", "is_active": True}),
+        ("applications", {
+            "user_city": "probe",
+            "target_city": "probe",
+            "is_active": True,
+            "expires_at": {"$gt": now},
+            "user_id": {"$ne": "probe"},
+        }),
+    ]
+
+
+async def ensure_indexes(db):
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.error(f"Failed to create indexes on {collection}: {e}")
+
+
+def _plan_stages(plan) -> List[str]:
+    if isinstance(plan, dict):
+        stages = [plan["stage"]] if "stage" in plan else []
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _plan_stages(item)]
+    return []
+
+
+async def verify_query_plans(db):
+    """Explain every query shape and raise if any of them would scan a whole collection"""
+    collscans = []
+    for collection, query in query_shapes():
+        explain = await db[collection].find(query).explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in _plan_stages(winning_plan):
+            collscans.append(f"{collection} {query}")
+    if collscans:
+        raise RuntimeError("Queries without index support (COLLSCAN): " + "; ".join(collscans))
+    logger.info(f"Query plan check passed for {len(query_shapes())} query shapes")
@@ -0,0 +1,58 @@
+import logging
+from typing import List
+
+from pymongo import ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+TRUSTED_LIKES_THRESHOLD = 4
+
+
+async def apply_like_delta(db, user_id: str, delta: int):
+    """Atomically adjust likes_count and recompute is_trusted; returns the updated counters"""
+    return await db.users.find_one_and_update(
+        {"id": user_id},
+        [
+            {"$set": {"likes_count": {"$max": [0, {"$add": [{"$ifNull": ["$likes_count", 0]}, delta]}]}}},
+            {"$set": {"is_trusted": {"$gte": ["$likes_count", TRUSTED_LIKES_THRESHOLD]}}},
+        ],
+        projection={"_id": 0, "likes_count": 1, "is_trusted": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _in_step(user: dict, likes_count: int) -> bool:
+    return user.get("likes_count") == likes_count and user.get("is_trusted") == (likes_count >= TRUSTED_LIKES_THRESHOLD)
+
+
+async def reconcile_likes(db, batch_size: int = 1000) -> List[str]:
+    """Repair likes_count/is_trusted drift against the likes collection; returns repaired user ids"""
+    counts = {}
+    async for row in db.likes.aggregate([{"$group": {"_id": "$target_user_id", "count": {"$sum": 1}}}]):
+        counts[row["_id"]] = row["count"]
+
+    repaired = []
+    operations = []
+    cursor = db.users.find({}, {"_id": 0, "id": 1, "likes_count": 1, "is_trusted": 1})
+    async for user in cursor:
+        if _in_step(user, counts.get(user["id"], 0)):
+            continue
+        # The aggregate is a snapshot taken before the scan; recount so a toggle since then isn't rolled back
+        likes_count = await db.likes.count_documents({"target_user_id": user["id"]})
+        if _in_step(user, likes_count):
+            continue
+        # Only if the counter is still the one read; a concurrent apply_like_delta wins
+        operations.append(UpdateOne(
+            {"id": user["id"], "likes_count": user.get("likes_count")},
+            {"$set": {"likes_count": likes_count, "is_trusted": likes_count >= TRUSTED_LIKES_THRESHOLD}}
+        ))
+        repaired.append(user["id"])
+        if len(operations) >= batch_size:
+            await db.users.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await db.users.bulk_write(operations, ordered=False)
+
+    if repaired:
+        logger.warning(f"Repaired like counters for {len(repaired)} users")
+    return repaired
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: Dict[LabelValues, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time"""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name, self.help, self.read = name, help, read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        # label values -> (per-bucket counts, sum, count)
+        self.series: Dict[LabelValues, list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self.lock:
+            series = self.series.setdefault(label_values, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        # Re-registering a name replaces it (e.g. gauges bound to a rebuilt app's caches)
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics.values() for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+))
+db_ops_per_request = registry.register(Histogram(
+    "http_request_db_operations", "Mongo commands issued per HTTP request", ("route",), COUNT_BUCKETS
+))
+db_command_latency = registry.register(Histogram(
+    "mongo_command_duration_seconds", "Mongo command latency", ("command",)
+))
+work_total = registry.register(Counter(
+    "app_operations_total", "Expensive operations (bcrypt, upstream currency fetches)", ("operation",)
+))
+loop_lag = registry.register(Histogram(
+    "event_loop_lag_seconds", "Delay between a scheduled wake-up and the event loop running it"
+))
+
+
+class RequestStats:
+    """Work done on behalf of the current HTTP request"""
+
+    def __init__(self):
+        self.db_commands: List[Tuple[str, str, float]] = []  # (command, collection, ms)
+        self.operations: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def breakdown(self) -> str:
+        commands = ", ".join(f"{command} {collection} {ms:.1f}ms" for command, collection, ms in self.db_commands)
+        operations = ", ".join(f"{name}={count}" for name, count in sorted(self.operations.items()))
+        return f"db[{len(self.db_commands)}]: {commands or '-'}; ops: {operations or '-'}"
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def note(operation: str):
+    """Count an expensive operation, globally and against the current request"""
+    work_total.inc(operation)
+    stats = current_request.get()
+    if stats is not None:
+        with stats.lock:
+            stats.operations[operation] = stats.operations.get(operation, 0) + 1
+
+
+def cache_ratio_gauge(name: str, help: str, cache) -> Gauge:
+    """Hit ratio of any object with hits/misses attributes"""
+    def read():
+        total = cache.hits + cache.misses
+        return cache.hits / total if total else 0.0
+    return registry.register(Gauge(name, help, read))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records every Mongo command; Motor runs it with the request's context copied in"""
+
+    def __init__(self):
+        self.collections: Dict[int, str] = {}
+
+    def started(self, event):
+        self.collections[event.request_id] = str(event.command.get(event.command_name, ""))
+
+    def _finished(self, event):
+        collection = self.collections.pop(event.request_id, "")
+        seconds = event.duration_micros / 1e6
+        db_command_latency.observe(seconds, event.command_name)
+        stats = current_request.get()
+        if stats is not None:
+            with stats.lock:
+                stats.db_commands.append((event.command_name, collection, seconds * 1000))
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request and logging slow ones with their query breakdown"""
+
+    def __init__(self, app, slow_request_ms: Optional[float] = None):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_latency.observe(elapsed, scope["method"], path, str(status["code"]))
+            db_ops_per_request.observe(len(stats.db_commands), path)
+            if self.slow_request_ms is not None and elapsed * 1000 >= self.slow_request_ms:
+                logger.warning(f"Slow request {scope['method']} {path} {elapsed * 1000:.1f}ms {stats.breakdown()}")
+
+
+async def monitor_loop_lag(interval: float = 0.5):
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        loop_lag.observe(max(0.0, loop.time() - scheduled))
@@ -0,0 +1,234 @@
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+Corridor = Tuple[str, str]
+# Position of an application within its corridor; also the keyset cursor
+SortKey = Tuple[datetime, str]
+
+
+def sort_key(app: dict) -> SortKey:
+    return app["created_at"], app["id"]
+
+
+class CorridorStats:
+    """Running aggregate of one corridor's live amounts, kept per currency."""
+
+    def __init__(self):
+        self.amounts: Dict[str, List[float]] = {}  # sorted, for the median
+        self.totals: Dict[str, float] = {}
+
+    def add(self, currency: str, amount: float):
+        insort(self.amounts.setdefault(currency, []), amount)
+        self.totals[currency] = self.totals.get(currency, 0.0) + amount
+
+    def remove(self, currency: str, amount: float):
+        amounts = self.amounts[currency]
+        del amounts[bisect_left(amounts, amount)]
+        self.totals[currency] -= amount
+        if not amounts:
+            del self.amounts[currency]
+            del self.totals[currency]
+
+    def summary(self) -> Dict[str, Tuple[float, float]]:
+        """currency -> (total, median)"""
+        result = {}
+        for currency, amounts in self.amounts.items():
+            middle = len(amounts) // 2
+            median = amounts[middle] if len(amounts) % 2 else (amounts[middle - 1] + amounts[middle]) / 2
+            result[currency] = (self.totals[currency], median)
+        return result
+
+
+class OrderBook:
+    """In-memory book of active applications keyed by (user_city, target_city) corridor."""
+
+    def __init__(self):
+        # Each corridor's applications and their sort keys, parallel lists in (created_at, id) order
+        self.corridors: Dict[Corridor, List[dict]] = {}
+        self.keys: Dict[Corridor, List[SortKey]] = {}
+        self.index: Dict[str, dict] = {}
+        self.expiry_heap: List[Tuple[datetime, str]] = []
+        # City graph: an edge user_city -> target_city exists while that corridor has applications
+        self.successors: Dict[str, Set[str]] = {}
+        self.predecessors: Dict[str, Set[str]] = {}
+        self.stats: Dict[Corridor, CorridorStats] = {}
+        # Bumped on every change, so readers can cache anything derived from the book
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, app_id: str) -> bool:
+        return app_id in self.index
+
+    def add(self, app: dict):
+        if not app.get("is_active", True):
+            return
+        self.remove(app["id"])
+        corridor = (app["user_city"], app["target_city"])
+        if corridor not in self.corridors:
+            self._link(*corridor)
+            self.stats[corridor] = CorridorStats()
+        self.stats[corridor].add(app.get("currency", "USD"), app["amount"])
+        self.version += 1
+        bucket = self.corridors.setdefault(corridor, [])
+        keys = self.keys.setdefault(corridor, [])
+        key = sort_key(app)
+        # New applications are the newest, so this is almost always an append
+        position = bisect_left(keys, key)
+        keys.insert(position, key)
+        bucket.insert(position, app)
+        self.index[app["id"]] = app
+        heapq.heappush(self.expiry_heap, (app["expires_at"], app["id"]))
+
+    def update_expiry(self, app_id: str, expires_at: datetime) -> bool:
+        app = self.get(app_id)
+        if app is None:
+            return False
+        app["expires_at"] = expires_at
+        heapq.heappush(self.expiry_heap, (expires_at, app_id))
+        return True
+
+    def get(self, app_id: str) -> Optional[dict]:
+        return self.index.get(app_id)
+
+    def remove(self, app_id: str) -> Optional[dict]:
+        app = self.index.pop(app_id, None)
+        if app is None:
+            return None
+        corridor = (app["user_city"], app["target_city"])
+        bucket, keys = self.corridors[corridor], self.keys[corridor]
+        position = bisect_left(keys, sort_key(app))
+        del keys[position]
+        del bucket[position]
+        self.version += 1
+        if not bucket:
+            del self.corridors[corridor]
+            del self.keys[corridor]
+            del self.stats[corridor]
+            self._unlink(*corridor)
+        else:
+            self.stats[corridor].remove(app.get("currency", "USD"), app["amount"])
+        return app
+
+    def _link(self, user_city: str, target_city: str):
+        self.successors.setdefault(user_city, set()).add(target_city)
+        self.predecessors.setdefault(target_city, set()).add(user_city)
+
+    def _unlink(self, user_city: str, target_city: str):
+        for edges, city, other in ((self.successors, user_city, target_city), (self.predecessors, target_city, user_city)):
+            cities = edges.get(city)
+            if cities is not None:
+                cities.discard(other)
+                if not cities:
+                    del edges[city]
+
+    def expire(self, now: Optional[datetime] = None) -> List[dict]:
+        """Drop every application whose expires_at has passed and return them."""
+        now = now or datetime.utcnow()
+        expired = []
+        while self.expiry_heap and self.expiry_heap[0][0] <= now:
+            expires_at, app_id = heapq.heappop(self.expiry_heap)
+            app = self.get(app_id)
+            # Stale heap entry left behind by a remove or a re-add with a new expiry
+            if app is None or app["expires_at"] != expires_at:
+                continue
+            expired.append(self.remove(app_id))
+        return expired
+
+    def iter_corridor(self, corridor: Corridor, before: Optional[SortKey] = None) -> Iterator[dict]:
+        """Yield a corridor's applications newest first, optionally only those before a (created_at, id) key.
+
+        Lazy and O(log n) per step: the position is re-found from the last key yielded,
+        so callers may await between items while the book changes.
+        """
+        while True:
+            keys = self.keys.get(corridor)
+            if not keys:
+                return
+            position = (len(keys) if before is None else bisect_left(keys, before)) - 1
+            if position < 0:
+                return
+            app = self.corridors[corridor][position]
+            before = keys[position]
+            yield app
+
+    def iter_matches(
+        self,
+        user_city: str,
+        target_city: str,
+        exclude_user_id: Optional[str] = None,
+        before: Optional[SortKey] = None,
+        now: Optional[datetime] = None,
+    ) -> Iterator[dict]:
+        """Yield a corridor's applications newest first, optionally only those before a (created_at, id) key."""
+        self.expire(now)
+        for app in self.iter_corridor((user_city, target_city), before):
+            if app["user_id"] != exclude_user_id:
+                yield app
+
+    def match(
+        self,
+        user_city: str,
+        target_city: str,
+        exclude_user_id: Optional[str] = None,
+        limit: int = 100,
+        now: Optional[datetime] = None,
+        before: Optional[SortKey] = None,
+    ) -> List[dict]:
+        return list(islice(self.iter_matches(user_city, target_city, exclude_user_id, before, now), limit))
+
+    def match_nearby(
+        self,
+        user_cities: Dict[str, float],
+        target_cities: Dict[str, float],
+        exclude_user_id: Optional[str] = None,
+        limit: int = 100,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[float, dict]]:
+        """Match across every corridor between two sets of cities, each mapped to its distance
+        from the requested city. Returns (total distance, application) pairs, nearest first."""
+        self.expire(now)
+        corridors = sorted(
+            (user_distance + target_distance, (user_city, target_city))
+            for user_city, user_distance in user_cities.items()
+            for target_city, target_distance in target_cities.items()
+            if (user_city, target_city) in self.corridors
+        )
+        result = []
+        for distance, corridor in corridors:
+            for app in self.iter_corridor(corridor):
+                if app["user_id"] == exclude_user_id:
+                    continue
+                result.append((distance, app))
+                if len(result) >= limit:
+                    return result
+        return result
+
+    def corridor_summaries(
+        self, now: Optional[datetime] = None
+    ) -> Iterator[Tuple[Corridor, int, datetime, Dict[str, Tuple[float, float]]]]:
+        """(corridor, live count, newest created_at, {currency: (total, median)}) for every live corridor."""
+        self.expire(now)
+        for corridor, bucket in self.corridors.items():
+            yield corridor, len(bucket), bucket[-1]["created_at"], self.stats[corridor].summary()
+
+    async def warm(self, collection):
+        """Load all active, unexpired applications from Mongo."""
+        self.corridors.clear()
+        self.keys.clear()
+        self.index.clear()
+        self.expiry_heap.clear()
+        self.successors.clear()
+        self.predecessors.clear()
+        self.stats.clear()
+        self.version += 1
+        cursor = collection.find(
+            {"is_active": True, "expires_at": {"$gt": datetime.utcnow()}}, {"_id": 0}
+        ).sort("created_at", 1)
+        async for app in cursor:
+            self.add(app)
+        return len(self)
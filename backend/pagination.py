@@ -0,0 +1,72 @@
+import base64
+from datetime import datetime
+from typing import AsyncIterable, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+# Keyset order shared by every paginated list: newest first, id breaks ties
+KEYSET_SORT = [("created_at", -1), ("id", -1)]
+
+CursorKey = Tuple[datetime, str]
+
+
+def encode_cursor(row: dict) -> str:
+    raw = f"{row['created_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[CursorKey]:
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(key: Optional[CursorKey]) -> dict:
+    """Mongo filter for rows strictly after key in KEYSET_SORT order"""
+    if key is None:
+        return {}
+    created_at, row_id = key
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": row_id}},
+    ]}
+
+
+async def merge_newest_first(*cursors: AsyncIterable[dict]):
+    """Merge async row streams that are each already in KEYSET_SORT order"""
+    iterators = [cursor.__aiter__() for cursor in cursors]
+    heads = {}
+    for i, iterator in enumerate(iterators):
+        try:
+            heads[i] = await iterator.__anext__()
+        except StopAsyncIteration:
+            pass
+    while heads:
+        i = max(heads, key=lambda j: (heads[j]["created_at"], heads[j]["id"]))
+        yield heads[i]
+        try:
+            heads[i] = await iterators[i].__anext__()
+        except StopAsyncIteration:
+            del heads[i]
+
+
+def page(rows: list, limit: int) -> dict:
+    """Split limit + 1 fetched rows into a page and the cursor for the next one"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {"rows": rows, "next_cursor": encode_cursor(rows[-1]) if has_more else None}
+
+
+def ndjson_response(rows: AsyncIterable[dict]) -> StreamingResponse:
+    async def lines():
+        async for row in rows:
+            yield orjson.dumps(row, default=jsonable_encoder, option=orjson.OPT_APPEND_NEWLINE)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,50 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Optional, Tuple
+
+
+class PasswordPoolSaturated(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so hashing never blocks the event loop."""
+
+    def __init__(self, rounds: int = 12, max_workers: int = 2, max_pending: int = 32):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    @cached_property
+    def context(self):
+        # passlib is imported on the first password operation, not at startup
+        from passlib.context import CryptContext
+        # Pinning min/max rounds makes passlib flag hashes of any other cost for rehash
+        return CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=self.rounds,
+            bcrypt__min_rounds=self.rounds,
+            bcrypt__max_rounds=self.rounds,
+        )
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise PasswordPoolSaturated(f"{self.pending} password operations already queued")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also returns a new hash when the stored one uses an outdated cost."""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
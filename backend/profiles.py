@@ -0,0 +1,80 @@
+import asyncio
+from typing import Iterable, Optional
+
+from pymongo import ReturnDocument
+
+from pagination import KEYSET_SORT
+
+PROFILE_COLLECTION = "profiles"
+# Newest comments kept on the profile document; longer pages fall back to the comments collection
+RECENT_COMMENTS = 100
+
+# Profiles built before public views dropped date_of_birth may still store it
+PROFILE_PROJECTION = {"_id": 0, "user.date_of_birth": 0}
+
+
+async def _read_comments(db, user_id: str):
+    comments_filter = {"target_user_id": user_id}
+    return await asyncio.gather(
+        db.comments.find(comments_filter, {"_id": 0}).sort(KEYSET_SORT).to_list(RECENT_COMMENTS),
+        db.comments.count_documents(comments_filter),
+    )
+
+
+async def build_profile(db, user_id: str, user_projection: dict) -> Optional[dict]:
+    """Materialize a user's profile document, or return the one another request already built"""
+    user = await db.users.find_one({"id": user_id}, user_projection)
+    if not user:
+        return None
+    recent_comments, comment_count = await _read_comments(db, user_id)
+    profile = {
+        "user_id": user_id,
+        "user": user,
+        "comment_count": comment_count,
+        "recent_comments": recent_comments,
+    }
+    profile = await db[PROFILE_COLLECTION].find_one_and_update(
+        {"user_id": user_id},
+        {"$setOnInsert": profile},
+        projection=PROFILE_PROJECTION,
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    # A comment written while the profile was being built found no document for
+    # record_comment to update; recheck so it isn't left out of the profile for good
+    if await db.comments.count_documents({"target_user_id": user_id}) == profile["comment_count"]:
+        return profile
+    # Drop the stale document (unless a record_comment already moved it on) so the next read rebuilds it
+    await db[PROFILE_COLLECTION].delete_one({"user_id": user_id, "comment_count": profile["comment_count"]})
+    recent_comments, comment_count = await _read_comments(db, user_id)
+    return {**profile, "comment_count": comment_count, "recent_comments": recent_comments}
+
+
+async def record_comment(db, comment: dict) -> Optional[dict]:
+    """Fold a new comment into its target's profile; returns the updated profile, if one exists"""
+    return await db[PROFILE_COLLECTION].find_one_and_update(
+        {"user_id": comment["target_user_id"]},
+        {
+            "$inc": {"comment_count": 1},
+            "$push": {"recent_comments": {"$each": [comment], "$position": 0, "$slice": RECENT_COMMENTS}},
+        },
+        projection=PROFILE_PROJECTION,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def record_like_counters(db, user_id: str, counters: dict) -> Optional[dict]:
+    """Copy likes_count/is_trusted from the user document onto the profile"""
+    return await db[PROFILE_COLLECTION].find_one_and_update(
+        {"user_id": user_id},
+        {"$set": {"user.likes_count": counters["likes_count"], "user.is_trusted": counters["is_trusted"]}},
+        projection=PROFILE_PROJECTION,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def drop_profiles(db, user_ids: Iterable[str]):
+    """Discard profile documents so they are rebuilt from source on next read"""
+    user_ids = list(user_ids)
+    if user_ids:
+        await db[PROFILE_COLLECTION].delete_many({"user_id": {"$in": user_ids}})
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+
+def corridor_channel(user_city: str, target_city: str) -> str:
+    return f"corridor:{user_city}|{target_city}"
+
+
+class Broker(ABC):
+    """Pub/sub interface. Messages are JSON-ready dicts."""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: dict):
+        ...
+
+    @abstractmethod
+    def subscribe(self, channel: str):
+        """Async context manager yielding an asyncio.Queue of messages for channel."""
+
+    @abstractmethod
+    def listen(self, callback: Callable[[str, dict], None]):
+        """Call callback(channel, message) for every message on every channel, for the life of the broker."""
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class InMemoryBroker(Broker):
+    """Fan-out to subscribers in this process only."""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.listeners: List[Callable[[str, dict], None]] = []
+
+    def listen(self, callback: Callable[[str, dict], None]):
+        self.listeners.append(callback)
+
+    def _deliver(self, channel: str, message: dict):
+        for callback in self.listeners:
+            try:
+                callback(channel, message)
+            except Exception:
+                logger.exception("Event listener failed")
+        for queue in self.subscribers.get(channel, ()):
+            # Slow subscribers lose their oldest messages rather than blocking publishers
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def publish(self, channel: str, message: dict):
+        self._deliver(channel, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self.subscribers.get(channel)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self.subscribers[channel]
+
+
+class MongoBroker(InMemoryBroker):
+    """Shares messages between worker processes through a capped collection.
+
+    Each process tails the collection and fans new messages out to its own
+    subscribers, so publishing never delivers locally directly.
+    """
+
+    def __init__(self, db, collection: str = "events", size_bytes: int = 16 * 1024 * 1024, queue_size: int = 100):
+        super().__init__(queue_size)
+        self.db = db
+        self.collection_name = collection
+        self.size_bytes = size_bytes
+        self.tail_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        try:
+            await self.db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass  # already exists
+        self.tail_task = asyncio.create_task(self._tail())
+
+    async def publish(self, channel: str, message: dict):
+        await self.db[self.collection_name].insert_one({"channel": channel, "message": message})
+
+    async def _tail(self):
+        collection = self.db[self.collection_name]
+        # Start after the newest existing event so restarts don't replay history
+        last = await collection.find_one(sort=[("$natural", -1)])
+        query = {"_id": {"$gt": last["_id"]}} if last else {}
+        while True:
+            try:
+                cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for event in cursor:
+                        query = {"_id": {"$gt": event["_id"]}}
+                        self._deliver(event["channel"], event["message"])
+                # Tailable cursors die on an empty collection; poll until the first event
+                await asyncio.sleep(0.5)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event tail failed; retrying")
+                await asyncio.sleep(1)
+
+    async def close(self):
+        if self.tail_task is not None:
+            self.tail_task.cancel()
+            self.tail_task = None
+
+
+def create_broker(backend: str, db) -> Broker:
+    if backend == "mongo":
+        return MongoBroker(db)
+    if backend == "memory":
+        return InMemoryBroker()
+    raise ValueError(f"Unknown pub/sub backend: {backend}")
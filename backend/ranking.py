@@ -0,0 +1,84 @@
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of each signal in the final score (each signal is in [0, 1])
+WEIGHTS = {"amount": 0.5, "trust": 0.3, "recency": 0.2}
+RECENCY_HALF_LIFE_DAYS = 7.0
+# likes_count at which the likes part of the trust signal saturates
+TRUST_LIKES_SATURATION = 20
+
+
+def score(
+    amounts: "np.ndarray",
+    reference_amount: Optional[float],
+    is_trusted: "np.ndarray",
+    likes_count: "np.ndarray",
+    age_days: "np.ndarray",
+) -> "np.ndarray":
+    import numpy as np
+    if reference_amount:
+        gap = np.abs(amounts - reference_amount) / np.maximum(amounts, reference_amount)
+        amount_score = 1.0 - np.clip(gap, 0.0, 1.0)
+    else:
+        amount_score = np.zeros_like(amounts)
+    likes_score = np.log1p(np.minimum(likes_count, TRUST_LIKES_SATURATION)) / np.log1p(TRUST_LIKES_SATURATION)
+    trust_score = 0.5 * is_trusted + 0.5 * likes_score
+    recency_score = np.exp2(-age_days / RECENCY_HALF_LIFE_DAYS)
+    return (
+        WEIGHTS["amount"] * amount_score
+        + WEIGHTS["trust"] * trust_score
+        + WEIGHTS["recency"] * recency_score
+    )
+
+
+def top_k(scores: "np.ndarray", k: int) -> "np.ndarray":
+    """Indices of the k best scores, best first, without sorting the whole array"""
+    import numpy as np
+    if k < len(scores):
+        best = np.argpartition(-scores, k - 1)[:k]
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+async def rank_applications(
+    applications: List[dict],
+    users: Dict[str, dict],
+    currency_service,
+    now: datetime,
+    limit: int,
+    amount: Optional[float] = None,
+    currency: str = "USD",
+) -> List[Tuple[float, dict]]:
+    """Score applications by amount closeness (in the caller's currency), trust and recency.
+
+    Returns (score, application) pairs for the top `limit`, best first.
+    """
+    applications = [app for app in applications if app["user_id"] in users]
+    if not applications:
+        return []
+
+    # numpy is imported on first use, keeping it off the API's cold start
+    import numpy as np
+    amounts = np.fromiter((app["amount"] for app in applications), dtype=float, count=len(applications))
+    if amount:
+        try:
+            amounts = await currency_service.convert(amounts, [app.get("currency", "USD") for app in applications], currency)
+        except Exception as e:
+            logger.warning(f"Ranking on unconverted amounts: {e}")
+
+    owners = [users[app["user_id"]] for app in applications]
+    scores = score(
+        amounts,
+        amount,
+        np.fromiter((owner.get("is_trusted", False) for owner in owners), dtype=float, count=len(owners)),
+        np.fromiter((owner.get("likes_count", 0) for owner in owners), dtype=float, count=len(owners)),
+        np.fromiter(((now - app["created_at"]).total_seconds() / 86400 for app in applications), dtype=float, count=len(applications)),
+    )
+    return [(round(float(scores[i]), 4), applications[i]) for i in top_k(scores, limit)]
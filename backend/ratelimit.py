@@ -0,0 +1,89 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+from pymongo import ReturnDocument
+
+
+class RateLimitStore(ABC):
+    """Token bucket storage. take() spends one token and returns (allowed, tokens_left)."""
+
+    @abstractmethod
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        ...
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> (tokens, updated_at); least recently used buckets are dropped first
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class MongoRateLimitStore(RateLimitStore):
+    """Buckets shared by every worker; refill and spend happen in one atomic update."""
+
+    def __init__(self, db, collection: str = "rate_limits"):
+        self.db = db
+        self.collection_name = collection
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        now = datetime.utcnow()
+        elapsed_seconds = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        bucket = await self.db[self.collection_name].find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [capacity, {"$add": [
+                        {"$ifNull": ["$tokens", capacity]},
+                        {"$multiply": [elapsed_seconds, refill_per_second]},
+                    ]}]},
+                    "updated_at": now,
+                }},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return bucket["allowed"], bucket["tokens"]
+
+
+def create_rate_limit_store(backend: str, db) -> RateLimitStore:
+    if backend == "mongo":
+        return MongoRateLimitStore(db)
+    if backend == "memory":
+        return InMemoryRateLimitStore()
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+class RateLimiter:
+    """Token bucket of capacity requests per key, refilled at refill_per_second"""
+
+    def __init__(self, store: RateLimitStore, name: str, capacity: float, refill_per_second: float):
+        self.store = store
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    async def hit(self, key: str) -> Optional[float]:
+        """Spend a token for key; returns None if allowed, else seconds until the next token"""
+        allowed, tokens = await self.store.take(f"{self.name}:{key}", self.capacity, self.refill_per_second)
+        if allowed:
+            return None
+        return (1 - tokens) / self.refill_per_second
@@ -1,77 +1,90 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query, Path, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Path, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ValidationError, validator
+from typing import List, Optional, Dict, Any, Tuple, TypedDict
 import uuid
 from datetime import datetime, timedelta
+from itertools import islice
 import re
-import requests
-from passlib.context import CryptContext
+import asyncio
+from contextlib import asynccontextmanager
+import json
 import jwt
+import orjson
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from cache import TTLCache
+from cities import city_catalog
+from coalesce import Coalescer, cache_key
+from currency import CurrencyService
+from cycles import MAX_CYCLE_LENGTH, find_cycles, usd_value
+from expiry import ARCHIVE_COLLECTION, archive_cancelled, recover_interrupted, sweep_expired
+from indexes import ensure_indexes, verify_query_plans
+from likes import apply_like_delta, reconcile_likes
+from metrics import MetricsMiddleware, MongoCommandListener, cache_ratio_gauge, monitor_loop_lag, note, registry
+from order_book import OrderBook
+from pagination import KEYSET_SORT, decode_cursor, encode_cursor, keyset_filter, merge_newest_first, ndjson_response, page
+from passwords import PasswordHasher, PasswordPoolSaturated
+from profiles import PROFILE_COLLECTION, PROFILE_PROJECTION, RECENT_COMMENTS, build_profile, drop_profiles, record_comment, record_like_counters
+from pubsub import Broker, corridor_channel, create_broker
+from ranking import rank_applications
+from ratelimit import RateLimiter, create_rate_limit_store
+from settings import Settings
+from shared_cache import SharedCache, create_shared_cache
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Create the main app without a prefix
-app = FastAPI(
-    title="SHAO MACAO",
-    description="Global mutual cash transaction matching platform",
-    version="1.0.0"
-)
-
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Shared state, built by create_app() so importing this module stays cheap and
+# needs neither a database nor any environment variables
+settings = Settings()
+client = None
+db = None
+# Password hashing (bcrypt runs on a bounded worker pool, off the event loop)
+password_hasher: Optional[PasswordHasher] = None
+# Per-process user cache used by auth; invalidated on writes that change a user
+user_cache: Optional[TTLCache] = None
+# Materialized profile documents, cached per process; writes in this process replace the entry
+profile_cache: Optional[TTLCache] = None
+# Cache shared by all workers, so N workers don't each repeat the same upstream fetches and queries
+shared_cache: Optional[SharedCache] = None
+currency_service: Optional[CurrencyService] = None
+# Matching engine: active applications held in memory by corridor
+order_book: Optional[OrderBook] = None
+# Pub/sub for application events: SSE subscribers, and every worker's order book
+broker: Optional[Broker] = None
+# Book events that arrive while the order book is warming, applied once it's loaded
+book_backlog: Optional[List[dict]] = None
+# Hot reads: identical concurrent requests share one computation, reused for a short TTL
+coalescer: Optional[Coalescer] = None
+# Token bucket rate limits by name
+rate_limiters: Dict[str, RateLimiter] = {}
 
-# JWT Secret
-JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-here')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
 
-# Currency Service
-class CurrencyService:
-    def __init__(self):
-        self.cache = {}
-        self.cache_duration = timedelta(hours=1)
-    
-    def get_exchange_rates(self, base_currency: str = 'USD') -> Dict:
-        cache_key = f"{base_currency}_{datetime.now().strftime('%Y%m%d%H')}"
-        
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-        
-        try:
-            # Using free ExchangeRate-API
-            url = f"https://api.exchangerate-api.com/v4/latest/{base_currency}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if 'rates' in data:
-                self.cache[cache_key] = data
-                return data
-            else:
-                raise ValueError("Invalid API response format")
-                
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Failed to fetch exchange rates: {str(e)}")
-
-currency_service = CurrencyService()
+# Identifies this worker process (ETags, background task leases)
+WORKER_ID = uuid.uuid4().hex[:8]
+# Most candidates scored per ranked search
+RANK_CANDIDATES = 2000
+# Encoded /corridors bodies keyed by (order book version, city filter)
+corridor_listings = TTLCache(maxsize=256, ttl=60)
+CORRIDOR_COLUMNS = ["user_city", "target_city", "live_count", "newest_at", "currency", "total_amount", "median_amount"]
+SUBSCRIPTION_KEEPALIVE_SECONDS = 15
 
 # Data Models
+APPLICATION_LIFETIME = timedelta(days=14)
+MAX_BATCH_ITEMS = 100
+
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     first_name: str
@@ -87,6 +100,39 @@ class User(BaseModel):
     likes_count: int = 0
     is_trusted: bool = False
 
+# Lean rows for read paths: projected straight from Mongo and serialized without pydantic
+class PublicUser(TypedDict):
+    """What other users may see of an account (no date of birth)"""
+    id: str
+    first_name: str
+    last_name: str
+    email: str
+    phone: str
+    country: str
+    city: str
+    business_card_number: str
+    created_at: datetime
+    is_active: bool
+    likes_count: int
+    is_trusted: bool
+
+class ApplicationRow(TypedDict, total=False):
+    id: str
+    user_id: str
+    user_city: str
+    target_city: str
+    amount: float
+    currency: str
+    created_at: datetime
+    expires_at: datetime
+    is_active: bool
+    cancelled_at: datetime
+    days_active: int
+    status: str
+    user: PublicUser
+    distance_km: float
+    score: float
+
 class UserCreate(BaseModel):
     first_name: str
     last_name: str
@@ -109,6 +155,11 @@ class UserCreate(BaseModel):
             raise ValueError('Invalid phone number format')
         return v
     
+    @validator('city')
+    def normalize_city(cls, v):
+        # Spell known cities the catalog way so corridors line up
+        return city_catalog.canonical(v)
+    
     @validator('date_of_birth')
     def validate_age(cls, v):
         today = datetime.now()
@@ -117,6 +168,17 @@ class UserCreate(BaseModel):
             raise ValueError('Must be at least 21 years old')
         return v
 
+class AuthUser(BaseModel):
+    """Identity carried in the JWT; enough for every endpoint without a DB lookup"""
+    id: str
+    city: str
+    name: str
+    
+    @validator('city')
+    def normalize_city(cls, v):
+        # Tokens and users from before city normalization may carry another spelling
+        return city_catalog.canonical(v)
+
 class UserLogin(BaseModel):
     email: str
     password: str
@@ -129,7 +191,7 @@ class Application(BaseModel):
     amount: float
     currency: str = "USD"
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    expires_at: datetime = Field(default_factory=lambda: datetime.utcnow() + timedelta(days=14))
+    expires_at: datetime = Field(default_factory=lambda: datetime.utcnow() + APPLICATION_LIFETIME)
     is_active: bool = True
     
 class ApplicationCreate(BaseModel):
@@ -137,6 +199,13 @@ class ApplicationCreate(BaseModel):
     amount: float
     currency: str = "USD"
     
+    @validator('target_city')
+    def validate_target_city(cls, v):
+        city = city_catalog.resolve(v)
+        if not city:
+            raise ValueError('Unknown city')
+        return city.name
+    
     @validator('amount')
     def validate_amount(cls, v):
         if v <= 0:
@@ -145,6 +214,11 @@ class ApplicationCreate(BaseModel):
             raise ValueError('Amount cannot exceed $6,000')
         return round(v, 2)
 
+class ApplicationBatch(BaseModel):
+    create: List[Dict[str, Any]] = []  # ApplicationCreate payloads, validated one by one
+    renew: List[str] = []               # Application ids
+    cancel: List[str] = []              # Application ids
+
 class Comment(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     target_user_id: str  # User being commented on
@@ -163,42 +237,54 @@ class Like(BaseModel):
     liker_id: str        # User giving the like
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-# World cities data (major cities with 1M+ population + capitals)
-WORLD_CITIES = [
-    # Major cities alphabetically
-    "Addis Ababa", "Adelaide", "Ahmedabad", "Alexandria", "Algiers", "Almaty",
-    "Amsterdam", "Ankara", "Athens", "Atlanta", "Auckland", "Baghdad", "Baku",
-    "Bangkok", "Barcelona", "Beijing", "Belgrade", "Berlin", "Birmingham", 
-    "Bogotá", "Boston", "Brisbane", "Brussels", "Bucharest", "Budapest",
-    "Buenos Aires", "Cairo", "Calgary", "Cape Town", "Caracas", "Casablanca",
-    "Chennai", "Chicago", "Cologne", "Copenhagen", "Dallas", "Damascus", "Delhi",
-    "Detroit", "Dhaka", "Dubai", "Dublin", "Düsseldorf", "Edinburgh", "Frankfurt",
-    "Geneva", "Glasgow", "Guadalajara", "Hamburg", "Helsinki", "Ho Chi Minh City",
-    "Hong Kong", "Houston", "Istanbul", "Jakarta", "Johannesburg", "Karachi",
-    "Kiev", "Kuala Lumpur", "Lagos", "Lahore", "Lima", "Lisbon", "London",
-    "Los Angeles", "Lyon", "Madrid", "Manchester", "Manila", "Melbourne",
-    "Mexico City", "Miami", "Milan", "Minneapolis", "Montreal", "Moscow",
-    "Mumbai", "Munich", "Nairobi", "New York", "Oslo", "Paris", "Perth",
-    "Philadelphia", "Phoenix", "Prague", "Riyadh", "Rome", "San Francisco",
-    "Santiago", "São Paulo", "Seoul", "Shanghai", "Singapore", "Stockholm",
-    "Sydney", "Taipei", "Tehran", "Tel Aviv", "Tokyo", "Toronto", "Vancouver",
-    "Vienna", "Warsaw", "Washington", "Zurich"
-]
-
 # Helper functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+def password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def hash_password(password: str) -> str:
+    note("bcrypt")
+    try:
+        return await password_hasher.hash(password)
+    except PasswordPoolSaturated:
+        raise password_pool_busy()
+
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Returns (is_valid, new_hash); new_hash is set when the stored hash needs a cost upgrade"""
+    note("bcrypt")
+    try:
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+    except PasswordPoolSaturated:
+        raise password_pool_busy()
 
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, settings.jwt_secret, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
+USER_PROJECTION = {"_id": 0, **{field: 1 for field in User.__fields__}}
+PUBLIC_USER_PROJECTION = {"_id": 0, **{field: 1 for field in PublicUser.__annotations__}}
+
+async def get_users_by_ids(user_ids, projection: dict = USER_PROJECTION) -> Dict[str, dict]:
+    """Fetch many users in a single $in query, keyed by user id"""
+    ids = list({user_id for user_id in user_ids if user_id})
+    if not ids:
+        return {}
+    users = await db.users.find({"id": {"$in": ids}}, projection).to_list(len(ids))
+    return {user["id"]: user for user in users}
+
+async def get_user_by_id(user_id: str) -> Optional[dict]:
+    users = await get_users_by_ids([user_id])
+    return users.get(user_id)
+
+def token_claims(user: User) -> dict:
+    return {"sub": user.id, "city": user.city, "name": f"{user.first_name} {user.last_name}"}
+
 def generate_business_card_number(country: str, phone: str) -> str:
     # Country codes mapping (simplified)
     country_codes = {
@@ -221,18 +307,194 @@ def generate_business_card_number(country: str, phone: str) -> str:
     phone_digits = re.sub(r'\D', '', phone)[-3:]
     return f"0000{country_code}{phone_digits}"
 
-async def get_current_user(token: str = None):
-    if not token:
-        return None
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
+async def get_cached_user(user_id: str) -> Optional[User]:
+    user = user_cache.get(user_id)
+    if user is None:
+        user_doc = await get_user_by_id(user_id)
+        if not user_doc:
             return None
-        user = await db.users.find_one({"id": user_id})
-        return User(**user) if user else None
+        user = User(**user_doc)
+        user_cache.set(user_id, user)
+    return user
+
+async def require_user(token: str = Query(..., description="Authentication token")) -> AuthUser:
+    """Auth dependency: trusts the JWT claims, falling back to the user cache for older tokens"""
+    try:
+        payload = jwt.decode(token, settings.jwt_secret, algorithms=[JWT_ALGORITHM])
     except jwt.PyJWTError:
-        return None
+        raise HTTPException(status_code=401, detail="Authentication required")
+    
+    user_id = payload.get("sub")
+    if user_id and payload.get("city") and payload.get("name"):
+        return AuthUser(id=user_id, city=payload["city"], name=payload["name"])
+    
+    user = await get_cached_user(user_id) if user_id else None
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    return AuthUser(id=user.id, city=user.city, name=f"{user.first_name} {user.last_name}")
+
+def rate_limited(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests",
+        headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+    )
+
+def limit_per_user(limiter: str):
+    async def dependency(current_user: AuthUser = Depends(require_user)):
+        retry_after = await rate_limiters[limiter].hit(current_user.id) if settings.rate_limits_enabled else None
+        if retry_after is not None:
+            raise rate_limited(retry_after)
+    return dependency
+
+def limit_per_ip(limiter: str):
+    async def dependency(request: Request):
+        client_ip = request.client.host if request.client else "unknown"
+        retry_after = await rate_limiters[limiter].hit(client_ip) if settings.rate_limits_enabled else None
+        if retry_after is not None:
+            raise rate_limited(retry_after)
+    return dependency
+
+def with_status(app: dict, now: datetime) -> dict:
+    return {
+        **app,
+        "days_active": (now - app["created_at"]).days,
+        "status": (
+            "Cancelled" if app.get("cancelled_at")
+            else "Active" if app["expires_at"] > now and app.get("is_active", True)
+            else "Expired"
+        )
+    }
+
+async def with_users(
+    applications: List[dict], now: datetime, users: Optional[Dict[str, PublicUser]] = None
+) -> List[ApplicationRow]:
+    # Get user details for all applications in one round trip
+    if users is None:
+        users = await get_users_by_ids((app["user_id"] for app in applications), PUBLIC_USER_PROJECTION)
+    return [
+        {**with_status(app, now), "user": users[app["user_id"]]}
+        for app in applications if app["user_id"] in users
+    ]
+
+async def with_authors(comments: List[dict], authors: Optional[Dict[str, dict]] = None) -> List[dict]:
+    # Show the author's current name, fetched in one round trip
+    if authors is None:
+        authors = await get_users_by_ids((comment["commenter_id"] for comment in comments), PUBLIC_USER_PROJECTION)
+    for comment in comments:
+        author = authors.get(comment["commenter_id"])
+        if author:
+            comment["commenter_name"] = f"{author['first_name']} {author['last_name']}"
+    return comments
+
+async def in_batches(rows, size: int = 100):
+    """Group a sync or async iterable of rows into lists of at most size"""
+    batch = []
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    else:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+async def publish_application_event(event: str, app: dict):
+    await broker.publish(
+        corridor_channel(app["user_city"], app["target_city"]),
+        {"event": event, "application": jsonable_encoder(app), "origin": WORKER_ID}
+    )
+
+def apply_book_event(channel: str, message: dict):
+    """Replay another worker's order book change on this worker's book"""
+    if message.get("origin") == WORKER_ID:
+        return
+    if book_backlog is not None:
+        book_backlog.append(message)
+        return
+    app = Application(**message["application"]).dict()
+    if message["event"] == "created":
+        order_book.add(app)
+    elif message["event"] == "renewed":
+        if not order_book.update_expiry(app["id"], app["expires_at"]):
+            order_book.add(app)
+    else:
+        order_book.remove(app["id"])
+
+async def get_profile(user_id: str) -> Optional[dict]:
+    profile = profile_cache.get(user_id)
+    if profile is None:
+        profile = await db[PROFILE_COLLECTION].find_one({"user_id": user_id}, PROFILE_PROJECTION)
+        if profile is None:
+            profile = await build_profile(db, user_id, PUBLIC_USER_PROJECTION)
+        if profile is not None:
+            profile_cache.set(user_id, profile)
+    return profile
+
+def refresh_profile(user_id: str, profile: Optional[dict]):
+    """Write-through: cache the profile a write just returned, or drop a stale entry"""
+    if profile is None:
+        profile_cache.invalidate(user_id)
+    else:
+        profile_cache.set(user_id, profile)
+
+def comments_query(user_id: str, cursor: Optional[str]):
+    query = {"target_user_id": user_id, **keyset_filter(decode_cursor(cursor))}
+    return db.comments.find(query, {"_id": 0}).sort(KEYSET_SORT)
+
+async def ranked_matches(
+    user_city: str,
+    target_city: str,
+    page_size: int,
+    radius_km: float,
+    rank: bool,
+    amount: Optional[float],
+    currency: str,
+    now: datetime,
+    exclude_user_id: Optional[str] = None
+) -> List[dict]:
+    """One page, nearest corridors first, or best match score first when ranking"""
+    rank = rank or amount is not None
+    candidate_limit = RANK_CANDIDATES if rank else page_size
+    if radius_km:
+        nearby = order_book.match_nearby(
+            city_catalog.nearby(target_city, radius_km),
+            city_catalog.nearby(user_city, radius_km),
+            exclude_user_id=exclude_user_id,
+            limit=candidate_limit,
+            now=now
+        )
+    else:
+        nearby = [
+            (0.0, app) for app in order_book.match(
+                target_city, user_city, exclude_user_id=exclude_user_id, limit=candidate_limit, now=now
+            )
+        ]
+    distances = {app["id"]: distance for distance, app in nearby}
+    candidates = [app for _, app in nearby]
+    
+    users = await get_users_by_ids((app["user_id"] for app in candidates), PUBLIC_USER_PROJECTION)
+    scores = {}
+    if rank:
+        scored = await rank_applications(
+            candidates, users, currency_service, now, page_size, amount=amount, currency=currency.upper()
+        )
+        candidates = [app for _, app in scored]
+        scores = {app["id"]: app_score for app_score, app in scored}
+    
+    rows = await with_users(candidates, now, users)
+    for row in rows:
+        if radius_km:
+            row["distance_km"] = distances[row["id"]]
+        if rank:
+            row["score"] = scores[row["id"]]
+    return rows
 
 # Routes
 @api_router.get("/")
@@ -244,11 +506,53 @@ async def root():
     }
 
 @api_router.get("/cities")
-async def get_cities():
+async def get_cities(request: Request):
     """Get list of supported cities"""
-    return {"cities": sorted(WORLD_CITIES)}
+    headers = {"ETag": city_catalog.etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == city_catalog.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=city_catalog.listing, media_type="application/json", headers=headers)
+
+def corridor_listing(city: Optional[str]) -> bytes:
+    """Flat, heatmap-ready table of live corridor aggregates, one row per corridor and currency"""
+    rows = [
+        [user_city, target_city, live_count, newest_at, currency, round(total, 2), median]
+        for (user_city, target_city), live_count, newest_at, amounts in order_book.corridor_summaries()
+        if city is None or city in (user_city, target_city)
+        for currency, (total, median) in sorted(amounts.items())
+    ]
+    return orjson.dumps({"columns": CORRIDOR_COLUMNS, "rows": rows})
 
-@api_router.post("/register")
+@api_router.get("/corridors", dependencies=[Depends(limit_per_ip("corridors"))])
+async def get_corridors(
+    request: Request,
+    city: Optional[str] = Query(None, description="Only corridors starting or ending in this city")
+):
+    """Live liquidity per corridor, served from the in-memory order book"""
+    if city is not None:
+        city = city_catalog.canonical(city)
+    order_book.expire(datetime.utcnow())
+    # Versions are per process, so the tag names the book instance too
+    etag = f'"{WORKER_ID}-{order_book.version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    key = (order_book.version, city)
+    body = corridor_listings.get(key)
+    if body is None:
+        body = corridor_listing(city)
+        corridor_listings.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/cities/search")
+async def search_cities(
+    q: str = Query(..., min_length=1, description="City name prefix; accents and typos are tolerated"),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Autocomplete supported cities"""
+    return {"cities": [city._asdict() for city in city_catalog.search(q, limit)]}
+
+@api_router.post("/register", dependencies=[Depends(limit_per_ip("auth"))])
 async def register_user(user_data: UserCreate):
     # Check if user already exists
     existing_user = await db.users.find_one({"email": user_data.email})
@@ -256,7 +560,7 @@ async def register_user(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     
     # Create user
     user_dict = user_data.dict()
@@ -270,7 +574,8 @@ async def register_user(user_data: UserCreate):
     await db.user_passwords.insert_one({"user_id": user.id, "password_hash": hashed_password})
     
     # Create access token
-    access_token = create_access_token(data={"sub": user.id})
+    user_cache.set(user.id, user)
+    access_token = create_access_token(data=token_claims(user))
     
     return {
         "message": "User registered successfully",
@@ -279,7 +584,7 @@ async def register_user(user_data: UserCreate):
         "token_type": "bearer"
     }
 
-@api_router.post("/login")
+@api_router.post("/login", dependencies=[Depends(limit_per_ip("auth"))])
 async def login_user(login_data: UserLogin):
     # Find user
     user = await db.users.find_one({"email": login_data.email})
@@ -288,25 +593,31 @@ async def login_user(login_data: UserLogin):
     
     # Check password
     password_record = await db.user_passwords.find_one({"user_id": user["id"]})
-    if not password_record or not verify_password(login_data.password, password_record["password_hash"]):
+    if not password_record:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    is_valid, new_hash = await verify_password(login_data.password, password_record["password_hash"])
+    if not is_valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Transparently rehash when the configured bcrypt cost has changed
+    if new_hash:
+        await db.user_passwords.update_one({"user_id": user["id"]}, {"$set": {"password_hash": new_hash}})
+    
     # Create access token
-    access_token = create_access_token(data={"sub": user["id"]})
+    user_obj = User(**user)
+    user_cache.set(user_obj.id, user_obj)
+    access_token = create_access_token(data=token_claims(user_obj))
     
     return {
         "message": "Login successful",
-        "user": User(**user),
+        "user": user_obj,
         "access_token": access_token,
         "token_type": "bearer"
     }
 
 @api_router.post("/applications")
-async def create_application(app_data: ApplicationCreate, token: str = Query(...)):
-    current_user = await get_current_user(token)
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
+async def create_application(app_data: ApplicationCreate, current_user: AuthUser = Depends(require_user)):
     application = Application(
         user_id=current_user.id,
         user_city=current_user.city,
@@ -316,102 +627,311 @@ async def create_application(app_data: ApplicationCreate, token: str = Query(...
     )
     
     await db.applications.insert_one(application.dict())
+    order_book.add(application.dict())
+    
+    # Notify users subscribed to the reverse corridor
+    await publish_application_event("created", {
+        **application.dict(),
+        "user": {"id": current_user.id, "name": current_user.name}
+    })
     
     return {
         "message": "Application created successfully",
         "application": application
     }
 
-@api_router.get("/applications/search")
-async def search_applications(
+@api_router.post("/applications/batch")
+async def batch_applications(batch: ApplicationBatch, current_user: AuthUser = Depends(require_user)):
+    """Create, renew and cancel many applications in one ordered bulk write"""
+    if len(batch.create) + len(batch.renew) + len(batch.cancel) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+    
+    now = datetime.utcnow()
+    results = {"create": [], "renew": [], "cancel": []}
+    # (section, result, application) for every queued write, in bulk order
+    operations, pending = [], []
+    
+    for index, payload in enumerate(batch.create):
+        try:
+            app_data = ApplicationCreate(**payload)
+        except ValidationError as e:
+            results["create"].append({
+                "index": index,
+                "status": "invalid",
+                "errors": [{"loc": list(error["loc"]), "msg": error["msg"]} for error in e.errors()]
+            })
+            continue
+        application = Application(
+            user_id=current_user.id,
+            user_city=current_user.city,
+            target_city=app_data.target_city,
+            amount=app_data.amount,
+            currency=app_data.currency
+        )
+        result = {"index": index, "status": "created", "application": application}
+        operations.append(InsertOne(application.dict()))
+        pending.append(("create", result, application.dict()))
+        results["create"].append(result)
+    
+    # Only the caller's own live applications can be renewed or cancelled
+    ids = list({*batch.renew, *batch.cancel})
+    owned = {
+        app["id"]: app for app in await db.applications.find(
+            {"id": {"$in": ids}, "user_id": current_user.id, "is_active": True}, {"_id": 0}
+        ).to_list(len(ids))
+    } if ids else {}
+    
+    expires_at = now + APPLICATION_LIFETIME
+    for section, app_ids in (("renew", batch.renew), ("cancel", batch.cancel)):
+        for app_id in app_ids:
+            app = owned.get(app_id)
+            if app is None:
+                results[section].append({"id": app_id, "status": "not_found"})
+                continue
+            if section == "renew":
+                update = {"$set": {"expires_at": expires_at}}
+                result = {"id": app_id, "status": "renewed", "expires_at": expires_at}
+            else:
+                update = {"$set": {"is_active": False, "cancelled_at": now}}
+                result = {"id": app_id, "status": "cancelled"}
+            operations.append(UpdateOne({"id": app_id, "user_id": current_user.id, "is_active": True}, update))
+            pending.append((section, result, app))
+            results[section].append(result)
+    
+    executed = len(operations)
+    if operations:
+        try:
+            await db.applications.bulk_write(operations, ordered=True)
+        except BulkWriteError as e:
+            # Ordered writes stop at the first error; later items were not applied
+            executed = e.details["writeErrors"][0]["index"]
+            pending[executed][1]["status"] = "failed"
+            for _, result, _ in pending[executed + 1:]:
+                result["status"] = "skipped"
+    
+    # Keep the order book and subscribers in step with what was written
+    for section, result, app in pending[:executed]:
+        if section == "create":
+            order_book.add(app)
+            await publish_application_event("created", {**app, "user": {"id": current_user.id, "name": current_user.name}})
+        elif section == "renew":
+            if not order_book.update_expiry(app["id"], expires_at):
+                order_book.add({**app, "expires_at": expires_at})
+            await publish_application_event("renewed", {**app, "expires_at": expires_at})
+        else:
+            order_book.remove(app["id"])
+            await publish_application_event("cancelled", {**app, "is_active": False, "cancelled_at": now})
+    
+    return {"results": results}
+
+@api_router.get("/applications/subscribe")
+async def subscribe_applications(
     target_city: str = Query(..., description="City where you're looking for counterparty"),
-    token: str = Query(..., description="Authentication token")
+    current_user: AuthUser = Depends(require_user)
 ):
-    current_user = await get_current_user(token)
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Authentication required")
+    """Server-Sent Events stream of applications created, renewed, cancelled or expired
+    in the corridor a search for target_city would return"""
+    channel = corridor_channel(city_catalog.canonical(target_city), current_user.city)
+    
+    async def events():
+        async with broker.subscribe(channel) as queue:
+            yield ": subscribed\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SUBSCRIPTION_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message["application"]["user_id"] == current_user.id:
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message['application'])}\n\n"
     
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/applications/search", dependencies=[Depends(limit_per_user("search"))])
+async def search_applications(
+    target_city: str = Query(..., description="City where you're looking for counterparty"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (default 100; unlimited when streaming)"),
+    stream: bool = Query(False, description="Stream rows as NDJSON"),
+    radius_km: float = Query(0, ge=0, le=1000, description="Also match counterparties in cities within this distance"),
+    rank: bool = Query(False, description="Order by match score instead of recency"),
+    amount: Optional[float] = Query(None, gt=0, description="Your amount; closer amounts rank higher"),
+    currency: str = Query("USD", description="Currency of amount"),
+    current_user: AuthUser = Depends(require_user)
+):
     # Find applications where:
     # - User is from target_city (reverse match)
     # - Looking for counterparty in current user's city
     # - Application is still active and not expired
     
+    # Applications store the catalog spelling of their cities
+    target_city = city_catalog.canonical(target_city)
     now = datetime.utcnow()
+    ranked = bool(radius_km or rank or amount)
+    if ranked and cursor:
+        raise HTTPException(status_code=400, detail="Cursor pagination is not supported for ranked or proximity search")
     
-    applications = await db.applications.find({
-        "user_city": target_city,
-        "target_city": current_user.city,
-        "is_active": True,
-        "expires_at": {"$gt": now},
-        "user_id": {"$ne": current_user.id}  # Don't show own applications
-    }, {"_id": 0}).to_list(100)
-    
-    # Get user details for each application
-    result = []
-    for app in applications:
-        user = await db.users.find_one({"id": app["user_id"]}, {"_id": 0})
-        if user:
-            days_active = (now - app["created_at"]).days
-            app_with_user = {
-                **app,
-                "user": User(**user),
-                "days_active": days_active,
-                "status": "Active" if app["expires_at"] > now else "Expired"
-            }
-            result.append(app_with_user)
-    
-    return {"applications": result}
-
-@api_router.get("/user/{user_id}")
-async def get_user_profile(user_id: str, token: str = Query(...)):
-    current_user = await get_current_user(token)
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Authentication required")
+    if stream:
+        if ranked:
+            rows = await ranked_matches(
+                current_user.city, target_city, limit or 100, radius_km, rank, amount, currency, now, current_user.id
+            )
+            async def ranked_rows():
+                for row in rows:
+                    yield row
+            return ndjson_response(ranked_rows())
+        
+        matches = order_book.iter_matches(
+            target_city,
+            current_user.city,
+            exclude_user_id=current_user.id,  # Don't show own applications
+            before=decode_cursor(cursor),
+            now=now
+        )
+        async def rows():
+            async for batch in in_batches(islice(matches, limit)):
+                for row in await with_users(batch, now):
+                    yield row
+        return ndjson_response(rows())
     
-    # Get user details
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # Everyone in the same city searching the same corridor shares one computation;
+    # the caller's own applications are filtered out afterwards
+    async def compute():
+        if ranked:
+            rows = await ranked_matches(current_user.city, target_city, limit or 100, radius_km, rank, amount, currency, now)
+            return {"applications": rows, "next_cursor": None}
+        matches = order_book.iter_matches(target_city, current_user.city, before=decode_cursor(cursor), now=now)
+        result = page(list(islice(matches, (limit or 100) + 1)), limit or 100)
+        return {
+            "applications": await with_users(result["rows"], now),
+            "next_cursor": result["next_cursor"]
+        }
     
-    user_obj = User(**user)
+    key = cache_key(
+        "search", user_city=current_user.city, target_city=target_city, cursor=cursor, limit=limit,
+        radius_km=radius_km, rank=rank, amount=amount, currency=currency.upper()
+    )
+    result = await coalescer.run(key, compute, ttl=settings.search_cache_ttl)
+    return ORJSONResponse({
+        "applications": [row for row in result["applications"] if row["user_id"] != current_user.id],
+        "next_cursor": result["next_cursor"]
+    })
+
+@api_router.get("/applications/cycles", dependencies=[Depends(limit_per_user("search"))])
+async def get_cycle_matches(
+    max_length: int = Query(MAX_CYCLE_LENGTH, ge=3, le=MAX_CYCLE_LENGTH, description="Most parties in a proposed cycle"),
+    tolerance: float = Query(0.2, gt=0, le=1, description="Allowed relative difference from your amount"),
+    limit: int = Query(10, ge=1, le=50, description="Most groups per application"),
+    current_user: AuthUser = Depends(require_user)
+):
+    """Propose multi-party match groups (A -> B -> C -> A) for your live applications"""
+    now = datetime.utcnow()
+    own = await db.applications.find(
+        {"user_id": current_user.id, "is_active": True, "expires_at": {"$gt": now}}, {"_id": 0, "id": 1}
+    ).to_list(None)
+    seeds = [app for app in (order_book.get(row["id"]) for row in own) if app is not None]
     
-    # Get comments for this user
-    comments = await db.comments.find({"target_user_id": user_id}, {"_id": 0}).to_list(100)
+    try:
+        usd_rates = (await currency_service.get_exchange_rates("USD"))["rates"]
+    except Exception as e:
+        # Without rates only same-currency legs can be compared
+        logger.warning(f"Cycle matching without exchange rates: {e}")
+        usd_rates = None
+    
+    proposals = [
+        (seed, group)
+        for seed in seeds
+        for group in find_cycles(order_book, seed, max_length, tolerance, limit, usd_rates, now)
+    ]
+    users = await get_users_by_ids(
+        (app["user_id"] for _, group in proposals for app in group), PUBLIC_USER_PROJECTION
+    )
+    groups = []
+    for seed, group in proposals:
+        legs = await with_users(group, now, users)
+        amounts = [usd_value(app, usd_rates) for app in group]
+        groups.append({
+            "application_id": seed["id"],
+            "cities": [app["user_city"] for app in group],
+            "legs": legs,
+            "amount_spread": round(max(amounts) / min(amounts) - 1, 4)
+        })
+    return ORJSONResponse({"groups": groups})
+
+@api_router.get("/user/{user_id}")
+async def get_user_profile(
+    user_id: str,
+    comments_limit: int = Query(100, ge=1, le=500),
+    current_user: AuthUser = Depends(require_user)
+):
+    # The profile document and the viewer's like are independent lookups
+    profile, like = await asyncio.gather(
+        get_profile(user_id),
+        db.likes.find_one({"target_user_id": user_id, "liker_id": current_user.id}, {"_id": 1})
+    )
+    if not profile:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    # Get likes count
-    likes_count = await db.likes.count_documents({"target_user_id": user_id})
+    if comments_limit <= RECENT_COMMENTS:
+        # Copies, since the profile may be the cached one; every comment path shows current author names
+        comments = await with_authors([dict(comment) for comment in profile["recent_comments"][:comments_limit]])
+        has_more = comments and profile["comment_count"] > len(comments)
+        comments_next_cursor = encode_cursor(comments[-1]) if has_more else None
+    else:
+        result = page(await comments_query(user_id, None).to_list(comments_limit + 1), comments_limit)
+        comments = await with_authors(result["rows"])
+        comments_next_cursor = result["next_cursor"]
     
-    # Check if current user has already liked this user
-    has_liked = await db.likes.find_one({"target_user_id": user_id, "liker_id": current_user.id}) is not None
+    return ORJSONResponse({
+        "user": profile["user"],
+        "comments": comments,
+        "comments_next_cursor": comments_next_cursor,
+        "likes_count": profile["user"].get("likes_count", 0),
+        "has_liked": like is not None
+    })
+
+@api_router.get("/user/{user_id}/comments")
+async def get_user_comments(
+    user_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (default 100; unlimited when streaming)"),
+    stream: bool = Query(False, description="Stream rows as NDJSON"),
+    current_user: AuthUser = Depends(require_user)
+):
+    comments = comments_query(user_id, cursor)
     
-    # Update trusted status if needed
-    if likes_count >= 4 and not user_obj.is_trusted:
-        await db.users.update_one({"id": user_id}, {"$set": {"is_trusted": True, "likes_count": likes_count}})
-        user_obj.is_trusted = True
+    if stream:
+        if limit:
+            comments = comments.limit(limit)
+        async def rows():
+            async for batch in in_batches(comments):
+                for row in await with_authors(batch):
+                    yield row
+        return ndjson_response(rows())
     
-    user_obj.likes_count = likes_count
+    result = page(await comments.to_list((limit or 100) + 1), limit or 100)
     
-    return {
-        "user": user_obj,
-        "comments": comments,
-        "likes_count": likes_count,
-        "has_liked": has_liked
-    }
+    return ORJSONResponse({
+        "comments": await with_authors(result["rows"]),
+        "next_cursor": result["next_cursor"]
+    })
 
 @api_router.post("/comments")
-async def create_comment(comment_data: CommentCreate, token: str = Query(...)):
-    current_user = await get_current_user(token)
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
+async def create_comment(comment_data: CommentCreate, current_user: AuthUser = Depends(require_user)):
     comment = Comment(
         target_user_id=comment_data.target_user_id,
         commenter_id=current_user.id,
-        commenter_name=f"{current_user.first_name} {current_user.last_name}",
+        commenter_name=current_user.name,
         content=comment_data.content
     )
     
     await db.comments.insert_one(comment.dict())
+    refresh_profile(comment.target_user_id, await record_comment(db, comment.dict()))
     
     return {
         "message": "Comment added successfully",
@@ -419,87 +939,100 @@ async def create_comment(comment_data: CommentCreate, token: str = Query(...)):
     }
 
 @api_router.post("/likes/{user_id}")
-async def toggle_like(user_id: str, token: str = Query(...)):
-    current_user = await get_current_user(token)
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
+async def toggle_like(user_id: str, current_user: AuthUser = Depends(require_user)):
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot like yourself")
     
-    # Check if already liked
-    existing_like = await db.likes.find_one({"target_user_id": user_id, "liker_id": current_user.id})
+    like_key = {"target_user_id": user_id, "liker_id": current_user.id}
     
-    if existing_like:
-        # Remove like
-        await db.likes.delete_one({"target_user_id": user_id, "liker_id": current_user.id})
+    # Remove the like if it exists, otherwise add it; the unique (target, liker) index settles races
+    removed = await db.likes.delete_one(like_key)
+    if removed.deleted_count:
+        delta = -1
         message = "Like removed"
     else:
-        # Add like
-        like = Like(target_user_id=user_id, liker_id=current_user.id)
-        await db.likes.insert_one(like.dict())
+        try:
+            like = Like(target_user_id=user_id, liker_id=current_user.id)
+            await db.likes.insert_one(like.dict())
+            delta = 1
+        except DuplicateKeyError:
+            delta = 0
         message = "Like added"
     
-    # Update likes count and trusted status
-    likes_count = await db.likes.count_documents({"target_user_id": user_id})
-    is_trusted = likes_count >= 4
-    
-    await db.users.update_one(
-        {"id": user_id}, 
-        {"$set": {"likes_count": likes_count, "is_trusted": is_trusted}}
-    )
+    # Update likes count and trusted status atomically on the user document
+    counters = await apply_like_delta(db, user_id, delta)
+    if counters is None:
+        if delta == 1:
+            await db.likes.delete_one(like_key)
+        raise HTTPException(status_code=404, detail="User not found")
+    user_cache.invalidate(user_id)
+    refresh_profile(user_id, await record_like_counters(db, user_id, counters))
     
     return {
         "message": message,
-        "likes_count": likes_count,
-        "is_trusted": is_trusted
+        "likes_count": counters["likes_count"],
+        "is_trusted": counters["is_trusted"]
     }
 
-@api_router.get("/currency/rates/{base_currency}")
+@api_router.get("/currency/rates/{base_currency}", dependencies=[Depends(limit_per_ip("rates"))])
 async def get_currency_rates(base_currency: str = "USD"):
     """Get current exchange rates"""
-    try:
-        rates_data = currency_service.get_exchange_rates(base_currency.upper())
+    base_currency = base_currency.upper()
+    
+    async def compute():
+        rates_data = await currency_service.get_exchange_rates(base_currency)
         return {
-            "base_currency": base_currency.upper(),
+            "base_currency": base_currency,
             "rates": rates_data.get("rates", {}),
             "last_updated": rates_data.get("date", "Unknown")
         }
+    
+    try:
+        return await coalescer.run(cache_key("rates", base=base_currency), compute, ttl=settings.rates_cache_ttl)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/my/applications")
-async def get_my_applications(token: str = Query(...)):
-    current_user = await get_current_user(token)
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Authentication required")
-    
-    applications = await db.applications.find({"user_id": current_user.id}, {"_id": 0}).to_list(100)
+async def get_my_applications(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (default 100; unlimited when streaming)"),
+    stream: bool = Query(False, description="Stream rows as NDJSON"),
+    current_user: AuthUser = Depends(require_user)
+):
+    # Expired applications live in the archive; merge both newest first
+    query = {"user_id": current_user.id, **keyset_filter(decode_cursor(cursor))}
+    live = db.applications.find(query, {"_id": 0}).sort(KEYSET_SORT)
+    archived = db[ARCHIVE_COLLECTION].find(query, {"_id": 0, "archived_at": 0}).sort(KEYSET_SORT)
     
     now = datetime.utcnow()
-    result = []
-    for app in applications:
-        days_active = (now - app["created_at"]).days
-        status = "Active" if app["expires_at"] > now and app["is_active"] else "Expired"
-        app_with_status = {
-            **app,
-            "days_active": days_active,
-            "status": status
-        }
-        result.append(app_with_status)
     
-    return {"applications": result}
-
-# Include the router in the main app
-app.include_router(api_router)
+    if stream:
+        if limit:
+            live, archived = live.limit(limit), archived.limit(limit)
+        async def rows():
+            count = 0
+            async for app in merge_newest_first(live, archived):
+                yield with_status(app, now)
+                count += 1
+                if limit and count >= limit:
+                    break
+        return ndjson_response(rows())
+    
+    page_size = limit or 100
+    applications = []
+    async for app in merge_newest_first(live.limit(page_size + 1), archived.limit(page_size + 1)):
+        applications.append(app)
+        if len(applications) > page_size:
+            break
+    result = page(applications, page_size)
+    
+    return ORJSONResponse({
+        "applications": [with_status(app, now) for app in result["rows"]],
+        "next_cursor": result["next_cursor"]
+    })
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 # Configure logging
 logging.basicConfig(
@@ -508,6 +1041,156 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+async def reconcile_likes_periodically(interval: float):
+    while True:
+        try:
+            # One worker per interval does the full scan; the rest skip this round
+            if await shared_cache.add("lease:likes-reconcile", WORKER_ID, ttl=interval * 0.9):
+                repaired = await reconcile_likes(db)
+                await drop_profiles(db, repaired)
+                for user_id in repaired:
+                    user_cache.invalidate(user_id)
+                    profile_cache.invalidate(user_id)
+        except Exception:
+            logger.exception("Like counter reconciliation failed")
+        await asyncio.sleep(interval)
+
+async def sweep_expired_periodically(interval: float):
+    while True:
+        try:
+            now = datetime.utcnow()
+            # Every pass, so a batch abandoned by a crashed worker is finished without a restart
+            await recover_interrupted(db, now)
+            await archive_cancelled(db, now)
+            expired = await sweep_expired(db, now)
+            order_book.expire(now)
+            for app in expired:
+                order_book.remove(app["id"])
+                await publish_application_event("expired", app)
+        except Exception:
+            logger.exception("Expiry sweep failed")
+        await asyncio.sleep(interval)
+
+async def warm_up():
+    """Everything a worker needs before it takes traffic"""
+    global book_backlog
+    await ensure_indexes(db)
+    # Opt-in: refuse to start if any router query shape falls back to a COLLSCAN
+    if settings.index_self_check:
+        await verify_query_plans(db)
+    
+    # Listen before loading, so changes other workers make during the load aren't missed
+    book_backlog = []
+    broker.listen(apply_book_event)
+    await broker.start()
+    count = await order_book.warm(db.applications)
+    backlog, book_backlog = book_backlog, None
+    for message in backlog:
+        apply_book_event("", message)
+    logger.info(f"Order book warmed with {count} active applications")
+    
+    try:
+        # Served from the shared cache when another worker already fetched them
+        await currency_service.get_exchange_rates()
+    except Exception as e:
+        logger.warning(f"Starting without exchange rates: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Uvicorn only starts accepting connections once this yields
+    await warm_up()
+    currency_service.start()
+    app.state.loop_lag_monitor = asyncio.create_task(monitor_loop_lag())
+    app.state.likes_reconciler = asyncio.create_task(
+        reconcile_likes_periodically(settings.likes_reconcile_interval)
+    )
+    app.state.expiry_sweeper = asyncio.create_task(
+        sweep_expired_periodically(settings.expiry_sweep_interval)
+    )
+    try:
+        yield
+    finally:
+        app.state.likes_reconciler.cancel()
+        app.state.expiry_sweeper.cancel()
+        app.state.loop_lag_monitor.cancel()
+        client.close()
+        password_hasher.shutdown()
+        await currency_service.close()
+        await broker.close()
+
+def create_app(app_settings: Optional[Settings] = None, mongo_client=None) -> FastAPI:
+    """Build the API and the state its routes share.
+
+    Settings default to the environment; mongo_client replaces the Motor client
+    built from settings.mongo_url (e.g. an in-memory stand-in).
+    
+    The routes read their state from this module's globals, so there is one live
+    app per process: calling create_app again rebinds that state, and any app built
+    earlier starts serving from the new database and services.
+    """
+    global settings, client, db, password_hasher, user_cache, profile_cache, shared_cache
+    global currency_service, order_book, broker, coalescer, rate_limiters
+    settings = app_settings or Settings.from_env()
+    if not settings.db_name or (mongo_client is None and not settings.mongo_url):
+        raise RuntimeError("MONGO_URL and DB_NAME must be set")
+    
+    if mongo_client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        # The command listener attributes every Mongo command to the request that issued it
+        mongo_client = AsyncIOMotorClient(settings.mongo_url, event_listeners=[MongoCommandListener()])
+    client = mongo_client
+    db = client[settings.db_name]
+    
+    password_hasher = PasswordHasher(
+        rounds=settings.bcrypt_rounds,
+        max_workers=settings.password_hash_workers,
+        max_pending=settings.password_hash_max_pending
+    )
+    user_cache = TTLCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl)
+    profile_cache = TTLCache(maxsize=settings.profile_cache_size, ttl=settings.profile_cache_ttl)
+    shared_cache = create_shared_cache(settings.cache_backend, db)
+    currency_service = CurrencyService(api_url=settings.currency_api_url, shared=shared_cache)
+    order_book = OrderBook()
+    broker = create_broker(settings.pubsub_backend, db)
+    coalescer = Coalescer(shared_cache)
+    rate_limit_store = create_rate_limit_store(settings.rate_limit_backend, db)
+    rate_limiters = {
+        name: RateLimiter(rate_limit_store, name, capacity=capacity, refill_per_second=refill)
+        for name, (capacity, refill) in settings.rate_limits.items()
+    }
+    
+    # Create the main app without a prefix
+    application = FastAPI(
+        title="SHAO MACAO",
+        description="Global mutual cash transaction matching platform",
+        version="1.0.0",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
+    )
+    application.include_router(api_router)
+    application.add_api_route("/metrics", metrics, include_in_schema=False)
+    
+    cache_ratio_gauge("user_cache_hit_ratio", "Auth user cache hit ratio", user_cache)
+    cache_ratio_gauge("currency_cache_hit_ratio", "Exchange rate table cache hit ratio", currency_service)
+    
+    application.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=settings.cors_origins,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Per-route latency and DB-ops histograms; SLOW_REQUEST_MS opts in to logging slow requests with their query breakdown
+    application.add_middleware(MetricsMiddleware, slow_request_ms=settings.slow_request_ms)
+    if settings.forwarded_allow_ips:
+        # Outermost, so per-IP rate limits see the real client behind the ingress
+        from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+        application.add_middleware(ProxyHeadersMiddleware, trusted_hosts=settings.forwarded_allow_ips)
+    return application
+
+def __getattr__(name: str):
+    # `uvicorn server:app` keeps working: the default app is built on first access
+    if name == "app":
+        application = globals()["app"] = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
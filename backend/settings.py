@@ -0,0 +1,97 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# Token buckets by limiter name: (capacity, refill per second)
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "search": (30, 5),
+    "auth": (10, 0.2),
+    "rates": (60, 10),
+    "corridors": (60, 10),
+}
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _rate_limits(environ: Mapping[str, str]) -> Dict[str, Tuple[float, float]]:
+    """RATE_LIMIT_<NAME>=<capacity>/<refill per second> overrides one limiter"""
+    limits = dict(DEFAULT_RATE_LIMITS)
+    for name in limits:
+        value = environ.get(f'RATE_LIMIT_{name.upper()}')
+        if value:
+            capacity, refill = value.split('/')
+            limits[name] = (float(capacity), float(refill))
+    return limits
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Typed API configuration; from_env() reads the same variables server.py always has."""
+
+    mongo_url: Optional[str] = None
+    db_name: Optional[str] = None
+    jwt_secret: str = "your-secret-key-here"
+    cors_origins: List[str] = field(default_factory=lambda: ["*"])
+    # None uses the public exchange rate API
+    currency_api_url: Optional[str] = None
+
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 60
+    profile_cache_size: int = 5000
+    profile_cache_ttl: float = 30
+
+    # "memory" for a single process, "mongo" to share state across workers.
+    # Workers keep their order books in step through pub/sub, so more than one
+    # worker needs PUBSUB_BACKEND=mongo
+    cache_backend: str = "memory"
+    pubsub_backend: str = "memory"
+    rate_limit_backend: str = "memory"
+    rate_limits_enabled: bool = True
+    rate_limits: Dict[str, Tuple[float, float]] = field(default_factory=lambda: dict(DEFAULT_RATE_LIMITS))
+    # Proxies trusted to report the client address in X-Forwarded-For. Per-IP limits
+    # key on that address, so set this behind an ingress or every client shares a bucket
+    forwarded_allow_ips: List[str] = field(default_factory=list)
+    search_cache_ttl: float = 1
+    rates_cache_ttl: float = 5
+
+    slow_request_ms: Optional[float] = None
+    index_self_check: bool = False
+    likes_reconcile_interval: float = 3600
+    expiry_sweep_interval: float = 60
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "Settings":
+        defaults = cls()
+        get = environ.get
+        return cls(
+            mongo_url=get('MONGO_URL'),
+            db_name=get('DB_NAME'),
+            jwt_secret=get('JWT_SECRET', defaults.jwt_secret),
+            cors_origins=get('CORS_ORIGINS', '*').split(','),
+            currency_api_url=get('CURRENCY_API_URL'),
+            bcrypt_rounds=int(get('BCRYPT_ROUNDS', defaults.bcrypt_rounds)),
+            password_hash_workers=int(get('PASSWORD_HASH_WORKERS', defaults.password_hash_workers)),
+            password_hash_max_pending=int(get('PASSWORD_HASH_MAX_PENDING', defaults.password_hash_max_pending)),
+            user_cache_size=int(get('USER_CACHE_SIZE', defaults.user_cache_size)),
+            user_cache_ttl=float(get('USER_CACHE_TTL', defaults.user_cache_ttl)),
+            profile_cache_size=int(get('PROFILE_CACHE_SIZE', defaults.profile_cache_size)),
+            profile_cache_ttl=float(get('PROFILE_CACHE_TTL', defaults.profile_cache_ttl)),
+            cache_backend=get('CACHE_BACKEND', defaults.cache_backend),
+            pubsub_backend=get('PUBSUB_BACKEND', defaults.pubsub_backend),
+            rate_limit_backend=get('RATE_LIMIT_BACKEND', defaults.rate_limit_backend),
+            rate_limits_enabled=_flag(get('RATE_LIMITS_ENABLED', 'true')),
+            rate_limits=_rate_limits(environ),
+            forwarded_allow_ips=[ip.strip() for ip in get('FORWARDED_ALLOW_IPS', '').split(',') if ip.strip()],
+            search_cache_ttl=float(get('SEARCH_CACHE_TTL', defaults.search_cache_ttl)),
+            rates_cache_ttl=float(get('RATES_CACHE_TTL', defaults.rates_cache_ttl)),
+            slow_request_ms=float(get('SLOW_REQUEST_MS')) if get('SLOW_REQUEST_MS') else None,
+            index_self_check=_flag(get('INDEX_SELF_CHECK', '')),
+            likes_reconcile_interval=float(get('LIKES_RECONCILE_INTERVAL', defaults.likes_reconcile_interval)),
+            expiry_sweep_interval=float(get('EXPIRY_SWEEP_INTERVAL', defaults.expiry_sweep_interval)),
+        )
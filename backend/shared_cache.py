@@ -0,0 +1,97 @@
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+
+from cache import TTLCache
+
+
+class SharedCache(ABC):
+    """Cache shared by every worker of the API; values are JSON-ready."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float):
+        ...
+
+    @abstractmethod
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Set key only if it is absent or expired; True if this call set it"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+
+class InMemorySharedCache(SharedCache):
+    """Single-process backend; with N workers each keeps its own copy."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.cache = TTLCache(maxsize=maxsize)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self.cache.set(key, value, ttl)
+
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        if self.cache.get(key) is not None:
+            return False
+        self.cache.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str):
+        self.cache.invalidate(key)
+
+
+class MongoSharedCache(SharedCache):
+    """Out-of-process backend in a Mongo collection; a TTL index removes old entries."""
+
+    def __init__(self, db, collection: str = "shared_cache"):
+        self.db = db
+        self.collection_name = collection
+
+    def _entry(self, value: Any, ttl: float) -> dict:
+        return {
+            "value": json.dumps(jsonable_encoder(value)),
+            "expires_at": datetime.utcnow() + timedelta(seconds=ttl),
+        }
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = await self.db[self.collection_name].find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"value": 1}
+        )
+        return json.loads(entry["value"]) if entry else None
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self.db[self.collection_name].replace_one({"_id": key}, self._entry(value, ttl), upsert=True)
+
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        # Matches only an expired entry; a live one makes the upsert collide on _id
+        try:
+            await self.db[self.collection_name].update_one(
+                {"_id": key, "expires_at": {"$lte": datetime.utcnow()}},
+                {"$set": self._entry(value, ttl)},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def delete(self, key: str):
+        await self.db[self.collection_name].delete_one({"_id": key})
+
+
+def create_shared_cache(backend: str, db) -> SharedCache:
+    if backend == "mongo":
+        return MongoSharedCache(db)
+    if backend == "memory":
+        return InMemorySharedCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+
+# Default p95 budgets (ms) per route and backend, for the default workload; override with --thresholds.
+# mongomock scans every document on every query in-process, so its budgets sit ~2x above
+# what that workload measures there and only catch large regressions; use a real MongoDB for tight ones.
+DEFAULT_THRESHOLDS = {
+    "mongo": {
+        "search": {"p95_ms": 50},
+        "profile": {"p95_ms": 50},
+        "like": {"p95_ms": 50},
+        "login": {"p95_ms": 2500},
+        "register": {"p95_ms": 2500},
+    },
+    "mongomock": {
+        "search": {"p95_ms": 1000},
+        "profile": {"p95_ms": 1500},
+        "like": {"p95_ms": 100},
+        "login": {"p95_ms": 2500},
+        "register": {"p95_ms": 2500},
+    },
+}
+
+# Cold `import server` budget (ms, best of --import-runs), and the heavy
+# dependencies that must stay out of it until first use
+DEFAULT_IMPORT_BUDGET_MS = 1000
+DEFERRED_MODULES = ("motor", "numpy", "httpx", "passlib", "pandas")
+IMPORT_PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import server\n"
+    "elapsed = (time.perf_counter() - start) * 1000\n"
+    "print(elapsed, *[m for m in sys.argv[1:] if m in sys.modules])\n"
+)
+
+# Relative frequency of each route in the mixed workload
+DEFAULT_MIX = {"search": 50, "profile": 25, "like": 15, "login": 7, "register": 3}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class SHAOMacaoBenchmark:
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.latencies = {route: [] for route in DEFAULT_MIX}
+        self.errors = {route: 0 for route in DEFAULT_MIX}
+        self.users = []
+        self.cities = []
+        self.password = "BenchPass123!"
+
+    def check_import_time(self):
+        """Time a cold `import server` in fresh interpreters; returns a list of failures"""
+        timings, eager = [], set()
+        for _ in range(self.args.import_runs):
+            result = subprocess.run(
+                [sys.executable, "-c", IMPORT_PROBE, *DEFERRED_MODULES],
+                cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+            )
+            elapsed, *loaded = result.stdout.split()
+            timings.append(float(elapsed))
+            eager.update(loaded)
+        best = min(timings)
+        print(f"⏱️  import server: {best:.0f} ms (best of {len(timings)}, budget {self.args.import_budget_ms:.0f} ms)")
+        failures = []
+        if best > self.args.import_budget_ms:
+            failures.append(f"import server {best:.0f} ms > {self.args.import_budget_ms:.0f}")
+        if eager:
+            failures.append(f"import server loads deferred modules: {', '.join(sorted(eager))}")
+        return failures
+
+    def boot_server(self):
+        """Build the app against a local MongoDB, or an in-memory stand-in"""
+        sys.path.insert(0, str(BACKEND_DIR))
+        import server
+        from settings import Settings
+
+        mongo_client = None
+        if not self.args.mongo_url:
+            try:
+                from mongomock_motor import AsyncMongoMockClient
+            except ImportError:
+                print("❌ Pass --mongo-url or install mongomock-motor for the in-memory stand-in")
+                raise SystemExit(2)
+            mongo_client = AsyncMongoMockClient()
+        settings = Settings(
+            mongo_url=self.args.mongo_url,
+            db_name=self.args.db_name,
+            bcrypt_rounds=self.args.bcrypt_rounds,
+            # Every simulated client shares one address; measure the routes, not the limiter
+            rate_limits_enabled=False,
+            expiry_sweep_interval=3600,
+        )
+        self.app = server.create_app(settings, mongo_client=mongo_client)
+        self.server = server
+        return server
+
+    async def seed(self):
+        server = self.server
+        db = server.db
+        print(f"🌱 Seeding {self.args.users} users, {self.args.applications} applications, "
+              f"{self.args.likes} likes, {self.args.comments} comments")
+        if self.args.mongo_url:
+            for name in ("users", "user_passwords", "applications", "applications_archive", "likes", "comments"):
+                await db[name].delete_many({})
+
+        self.cities = server.city_catalog.names[:self.args.cities]
+        password_hash = await server.hash_password(self.password)
+        users, passwords = [], []
+        for i in range(self.args.users):
+            user = server.User(
+                first_name="Bench",
+                last_name=f"User{i}",
+                email=f"bench_{i}@example.com",
+                phone=f"+1555{i:07d}",
+                country="USA",
+                city=self.random.choice(self.cities),
+                date_of_birth=datetime(1990, 1, 1),
+            )
+            users.append(user.dict())
+            passwords.append({"user_id": user.id, "password_hash": password_hash})
+            self.users.append({
+                "id": user.id,
+                "email": user.email,
+                "city": user.city,
+                "token": server.create_access_token(server.token_claims(user)),
+            })
+        await db.users.insert_many(users)
+        await db.user_passwords.insert_many(passwords)
+
+        now = datetime.utcnow()
+        applications = []
+        for _ in range(self.args.applications):
+            owner = self.random.choice(self.users)
+            created_at = now - timedelta(minutes=self.random.randint(0, 60 * 24 * 13))
+            applications.append(server.Application(
+                user_id=owner["id"],
+                user_city=owner["city"],
+                target_city=self.random.choice(self.cities),
+                amount=round(self.random.uniform(10, 6000), 2),
+                created_at=created_at,
+                expires_at=created_at + server.APPLICATION_LIFETIME,
+            ).dict())
+        if applications:
+            await db.applications.insert_many(applications)
+
+        likes = {}
+        while len(likes) < min(self.args.likes, len(self.users) * (len(self.users) - 1)):
+            liker, target = self.random.sample(self.users, 2)
+            likes[(target["id"], liker["id"])] = server.Like(target_user_id=target["id"], liker_id=liker["id"]).dict()
+        if likes:
+            await db.likes.insert_many(list(likes.values()))
+
+        comments = []
+        for _ in range(self.args.comments):
+            author, target = self.random.sample(self.users, 2)
+            comments.append(server.Comment(
+                target_user_id=target["id"],
+                commenter_id=author["id"],
+                commenter_name="Bench",
+                content="Reliable counterparty",
+            ).dict())
+        if comments:
+            await db.comments.insert_many(comments)
+
+    async def call(self, client, route):
+        user = self.random.choice(self.users)
+        if route == "search":
+            return await client.get("/api/applications/search", params={
+                "target_city": self.random.choice(self.cities), "token": user["token"]
+            })
+        if route == "profile":
+            return await client.get(f"/api/user/{self.random.choice(self.users)['id']}", params={"token": user["token"]})
+        if route == "like":
+            target = self.random.choice(self.users)
+            if target["id"] == user["id"]:
+                target = self.users[(self.users.index(target) + 1) % len(self.users)]
+            return await client.post(f"/api/likes/{target['id']}", params={"token": user["token"]})
+        if route == "login":
+            return await client.post("/api/login", json={"email": user["email"], "password": self.password})
+        if route == "register":
+            return await client.post("/api/register", json={
+                "first_name": "Bench",
+                "last_name": "Signup",
+                "email": f"signup_{uuid.uuid4().hex}@example.com",
+                "phone": "+15550000000",
+                "country": "USA",
+                "city": self.random.choice(self.cities),
+                "date_of_birth": "1990-01-01T00:00:00",
+                "password": self.password,
+            })
+        raise ValueError(route)
+
+    async def worker(self, client, routes, weights, deadline):
+        while time.perf_counter() < deadline:
+            route = self.random.choices(routes, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await self.call(client, route)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            self.latencies[route].append((time.perf_counter() - start) * 1000)
+            if not ok:
+                self.errors[route] += 1
+
+    async def drive(self):
+        mix = {route: weight for route, weight in DEFAULT_MIX.items() if route in self.args.routes}
+        routes, weights = list(mix), list(mix.values())
+        app = self.app
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            await self.seed()
+            await self.server.order_book.warm(self.server.db.applications)
+            print(f"🚀 Driving {self.args.concurrency} concurrent clients for {self.args.duration}s")
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                deadline = time.perf_counter() + self.args.duration
+                await asyncio.gather(*[
+                    self.worker(client, routes, weights, deadline) for _ in range(self.args.concurrency)
+                ])
+
+    def report(self, thresholds):
+        print("\n" + "=" * 72)
+        print(f"{'route':<10}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        failures = []
+        summary = {}
+        for route, values in self.latencies.items():
+            if not values:
+                continue
+            values = sorted(values)
+            stats = {
+                "count": len(values),
+                "errors": self.errors[route],
+                "rps": len(values) / self.args.duration,
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+            }
+            summary[route] = stats
+            print(f"{route:<10}{stats['count']:>8}{stats['errors']:>8}{stats['rps']:>10.1f}"
+                  f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+            for metric, limit in thresholds.get(route, {}).items():
+                if stats.get(metric, 0) > limit:
+                    failures.append(f"{route} {metric} {stats[metric]:.2f} > {limit}")
+        print("=" * 72)
+
+        if self.args.json_output:
+            Path(self.args.json_output).write_text(json.dumps(summary, indent=2))
+
+        if failures or self.import_failures:
+            print("❌ Regression thresholds exceeded:")
+            for failure in failures + self.import_failures:
+                print(f"   {failure}")
+            return 1
+        print("🎉 All routes within thresholds")
+        return 0
+
+    def run(self):
+        thresholds = DEFAULT_THRESHOLDS["mongo" if self.args.mongo_url else "mongomock"]
+        if self.args.thresholds:
+            thresholds = json.loads(Path(self.args.thresholds).read_text())
+        self.import_failures = self.check_import_time() if self.args.import_runs else []
+        self.boot_server()
+        asyncio.run(self.drive())
+        return self.report(thresholds)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Latency benchmark for the SHAO MACAO API")
+    parser.add_argument("--mongo-url", help="Local MongoDB to use; defaults to an in-memory stand-in")
+    parser.add_argument("--db-name", default="shaomacao_benchmark")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--applications", type=int, default=5000)
+    parser.add_argument("--likes", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=2000)
+    parser.add_argument("--cities", type=int, default=20, help="Seed across the first N catalog cities")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per run")
+    parser.add_argument("--routes", nargs="+", default=list(DEFAULT_MIX), choices=list(DEFAULT_MIX))
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="Lower than production to keep seeding fast")
+    parser.add_argument("--thresholds", help="JSON file of {route: {metric: limit}}")
+    parser.add_argument("--import-budget-ms", type=float, default=DEFAULT_IMPORT_BUDGET_MS,
+                        help="Fail when a cold `import server` takes longer")
+    parser.add_argument("--import-runs", type=int, default=3, help="Cold imports timed; 0 skips the check")
+    parser.add_argument("--json-output", help="Write per-route stats to this file")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    # server.py logs at INFO; httpx would log every request, tokens included
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return SHAOMacaoBenchmark(parse_args(argv)).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+# The backend modules import each other as top-level modules, as they do when server.py runs
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+NOW = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def now():
+    return NOW
+
+
+@pytest.fixture
+def make_application():
+    """Factory for application documents; created and expires are hours from NOW"""
+    def make(app_id, user_id="u1", user_city="London", target_city="Dubai", amount=100.0, currency="USD",
+             created=0, expires=14 * 24, **fields):
+        return {
+            "id": app_id,
+            "user_id": user_id,
+            "user_city": user_city,
+            "target_city": target_city,
+            "amount": amount,
+            "currency": currency,
+            "created_at": NOW + timedelta(hours=created),
+            "expires_at": NOW + timedelta(hours=expires),
+            "is_active": True,
+            **fields,
+        }
+    return make
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["test"]
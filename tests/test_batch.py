@@ -0,0 +1,64 @@
+import asyncio
+import itertools
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+from settings import Settings
+
+
+@pytest.fixture
+def api(monkeypatch):
+    server.create_app(Settings.from_env({"DB_NAME": "test"}), mongo_client=AsyncMongoMockClient())
+    # Predictable application ids, so a test can make one collide
+    ids = (f"new{i}" for i in itertools.count())
+    monkeypatch.setattr(server.uuid, "uuid4", lambda: next(ids))
+    return server
+
+
+@pytest.fixture
+def user():
+    return server.AuthUser(id="u1", city="London", name="Ann")
+
+
+def batch(api, user, **items):
+    async def run():
+        await api.db.applications.create_index("id", unique=True)
+        return await api.batch_applications(api.ApplicationBatch(**items), user)
+    return asyncio.run(run())["results"]
+
+
+def test_batch_creates_renews_and_cancels(api, user, make_application):
+    asyncio.run(api.db.applications.insert_many([make_application("r1"), make_application("c1")]))
+    for app_id in ("r1", "c1"):
+        api.order_book.add(make_application(app_id))
+    results = batch(
+        api, user,
+        create=[{"target_city": "Dubai", "amount": 50}, {"target_city": "Atlantis", "amount": 50}],
+        renew=["r1", "missing"],
+        cancel=["c1"],
+    )
+
+    assert [r["status"] for r in results["create"]] == ["created", "invalid"]
+    assert [r["status"] for r in results["renew"]] == ["renewed", "not_found"]
+    assert [r["status"] for r in results["cancel"]] == ["cancelled"]
+    assert set(api.order_book.index) == {"new0", "r1"}
+    assert api.order_book.index["r1"]["expires_at"] == results["renew"][0]["expires_at"]
+
+
+def test_batch_stops_at_the_first_failed_write(api, user, make_application):
+    # new1 is already taken, so the second insert fails and everything after it is not applied
+    asyncio.run(api.db.applications.insert_many([make_application("new1"), make_application("c1")]))
+    api.order_book.add(make_application("c1"))
+    results = batch(
+        api, user,
+        create=[{"target_city": "Dubai", "amount": 50}] * 3,
+        cancel=["c1"],
+    )
+
+    assert [r["status"] for r in results["create"]] == ["created", "failed", "skipped"]
+    assert [r["status"] for r in results["cancel"]] == ["skipped"]
+    assert set(api.order_book.index) == {"new0", "c1"}
+    live = asyncio.run(api.db.applications.find({"is_active": True}).to_list(None))
+    assert sorted(app["id"] for app in live) == ["c1", "new0", "new1"]
@@ -0,0 +1,48 @@
+import asyncio
+
+from coalesce import Coalescer, cache_key
+from shared_cache import InMemorySharedCache
+
+
+def test_concurrent_callers_share_one_computation():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"rows": len(calls)}
+
+    async def run():
+        coalescer = Coalescer(InMemorySharedCache())
+        results = await asyncio.gather(*(coalescer.run("k", compute) for _ in range(5)))
+        return results, coalescer.inflight
+
+    results, inflight = asyncio.run(run())
+    assert calls == [1]
+    assert results == [{"rows": 1}] * 5
+    assert inflight == {}
+
+
+def test_results_are_cached_for_ttl_only():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        cache = InMemorySharedCache()
+        coalescer = Coalescer(cache)
+        first = await coalescer.run("k", compute, ttl=60)
+        cached = await coalescer.run("k", compute, ttl=60)
+        await cache.delete("k")
+        recomputed = await coalescer.run("k", compute, ttl=0)
+        uncached = await coalescer.run("k", compute, ttl=0)
+        return first, cached, recomputed, uncached
+
+    assert asyncio.run(run()) == (1, 1, 2, 3)
+
+
+def test_cache_key_ignores_parameter_order_and_none():
+    assert cache_key("rates", base="USD", day=None) == "rates?base=USD"
+    assert cache_key("search", b=2, a=1) == cache_key("search", a=1, b=2) == "search?a=1&b=2"
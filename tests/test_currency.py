@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from currency import CurrencyService
+from shared_cache import InMemorySharedCache
+
+RATES = {"base": "USD", "rates": {"USD": 1.0, "EUR": 0.92, "AED": 3.6725, "IRR": 42105.0}}
+
+
+@pytest.fixture
+def service():
+    # Seeded with a fresh table, so nothing goes upstream
+    service = CurrencyService(api_url="http://upstream.invalid/{base}")
+    service.table = (datetime.utcnow(), RATES)
+    return service
+
+
+def test_derived_rates_keep_full_precision(service):
+    rates = asyncio.run(service.get_exchange_rates("IRR"))
+
+    assert rates["base"] == "IRR"
+    assert rates["rates"]["IRR"] == 1.0
+    # A rounded cross rate would read 0.0 for a base this weak
+    assert rates["rates"]["USD"] == pytest.approx(1 / 42105.0)
+    assert rates["rates"]["EUR"] * 42105.0 == pytest.approx(0.92)
+
+
+def test_derived_tables_are_cached_and_dropped_on_refresh(service):
+    service.max_derived = 2
+    for base in ("EUR", "AED", "IRR"):
+        asyncio.run(service.get_exchange_rates(base))
+    assert list(service.derived) == ["AED", "IRR"]
+    assert asyncio.run(service.get_exchange_rates("USD")) is RATES
+
+    service._store(datetime.utcnow(), RATES)
+    assert not service.derived
+
+
+def test_unsupported_base_is_rejected(service):
+    with pytest.raises(ValueError, match="XYZ"):
+        asyncio.run(service.get_exchange_rates("XYZ"))
+
+
+def test_convert_with_one_or_many_source_currencies(service):
+    assert asyncio.run(service.convert([100, 200], "EUR", "USD")) == pytest.approx([100 / 0.92, 200 / 0.92])
+    converted = asyncio.run(service.convert(np.array([1.0, 3.6725, 42105.0]), ["USD", "AED", "IRR"], "EUR"))
+    assert converted == pytest.approx([0.92, 0.92, 0.92])
+
+
+def test_convert_rejects_unsupported_currencies(service):
+    with pytest.raises(ValueError, match="XYZ"):
+        asyncio.run(service.convert([1.0], ["XYZ"], "USD"))
+    with pytest.raises(ValueError, match="XYZ"):
+        asyncio.run(service.convert([1.0], "USD", "XYZ"))
+
+
+def test_fetch_reuses_another_workers_table():
+    shared = InMemorySharedCache()
+    fetched_at = datetime.utcnow() - timedelta(minutes=5)
+    asyncio.run(shared.set("currency:USD", {"fetched_at": fetched_at.isoformat(), "data": RATES}, 3600))
+    service = CurrencyService(api_url="http://upstream.invalid/{base}", shared=shared)
+
+    assert asyncio.run(service.get_exchange_rates("USD")) == RATES
+    assert service.table == (fetched_at, RATES)
@@ -0,0 +1,103 @@
+import pytest
+
+from cycles import find_cycles
+from order_book import OrderBook
+
+
+@pytest.fixture
+def leg(make_application):
+    """An application from user_id on the user_city -> target_city corridor"""
+    def make(app_id, user_id, user_city, target_city, **fields):
+        return make_application(app_id, user_id=user_id, user_city=user_city, target_city=target_city, **fields)
+    return make
+
+
+@pytest.fixture
+def seed(leg):
+    return leg("seed", "u0", "London", "Dubai")
+
+
+def book_of(*apps):
+    book = OrderBook()
+    for app in apps:
+        book.add(app)
+    return book
+
+
+def groups(result):
+    return [[app["id"] for app in group] for group in result]
+
+
+def test_three_party_cycle(leg, seed, now):
+    book = book_of(seed, leg("dp", "u1", "Dubai", "Paris"), leg("pl", "u2", "Paris", "London"))
+
+    assert groups(find_cycles(book, seed, now=now)) == [["seed", "dp", "pl"]]
+
+
+def test_shorter_cycles_come_first(leg, seed, now):
+    book = book_of(
+        seed,
+        leg("dp", "u1", "Dubai", "Paris"),
+        leg("pl", "u2", "Paris", "London"),
+        leg("dt", "u3", "Dubai", "Tokyo"),
+        leg("tr", "u4", "Tokyo", "Rome"),
+        leg("rl", "u5", "Rome", "London"),
+    )
+
+    assert groups(find_cycles(book, seed, now=now)) == [["seed", "dp", "pl"], ["seed", "dt", "tr", "rl"]]
+    assert groups(find_cycles(book, seed, max_length=3, now=now)) == [["seed", "dp", "pl"]]
+
+
+def test_every_leg_belongs_to_a_different_user(leg, seed, now):
+    book = book_of(
+        seed,
+        leg("dp", "u1", "Dubai", "Paris"),
+        leg("own", "u0", "Paris", "London"),
+        leg("again", "u1", "Paris", "London"),
+    )
+
+    assert find_cycles(book, seed, now=now) == []
+
+    book.add(leg("pl", "u2", "Paris", "London"))
+    assert groups(find_cycles(book, seed, now=now)) == [["seed", "dp", "pl"]]
+
+
+def test_legs_must_be_within_tolerance_of_the_seed(leg, seed, now):
+    book = book_of(
+        seed,
+        leg("dp", "u1", "Dubai", "Paris", amount=115),
+        leg("far", "u2", "Paris", "London", amount=130),
+    )
+
+    assert find_cycles(book, seed, now=now) == []
+    assert groups(find_cycles(book, seed, tolerance=0.3, now=now)) == [["seed", "dp", "far"]]
+
+
+def test_closest_amount_wins_a_leg(leg, seed, now):
+    book = book_of(
+        seed,
+        leg("dp", "u1", "Dubai", "Paris"),
+        leg("near", "u2", "Paris", "London", amount=102),
+        leg("nearer", "u3", "Paris", "London", amount=99.5),
+    )
+
+    assert groups(find_cycles(book, seed, now=now)) == [["seed", "dp", "nearer"]]
+
+
+def test_expired_legs_are_skipped(leg, seed, now):
+    book = book_of(seed, leg("dp", "u1", "Dubai", "Paris"), leg("pl", "u2", "Paris", "London", expires=1))
+
+    assert groups(find_cycles(book, seed, now=now)) == [["seed", "dp", "pl"]]
+    assert find_cycles(book, seed, now=now.replace(hour=2)) == []
+
+
+def test_amounts_compare_in_usd(leg, seed, now):
+    book = book_of(
+        seed,
+        leg("dp", "u1", "Dubai", "Paris", amount=90, currency="EUR"),
+        leg("pl", "u2", "Paris", "London", amount=80, currency="GBP"),
+    )
+    usd_rates = {"USD": 1.0, "EUR": 0.9, "GBP": 0.8}
+
+    assert find_cycles(book, seed, now=now) == []
+    assert groups(find_cycles(book, seed, usd_rates=usd_rates, now=now)) == [["seed", "dp", "pl"]]
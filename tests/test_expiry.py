@@ -0,0 +1,111 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from expiry import ARCHIVE_COLLECTION, CLAIM_TIMEOUT, archive_cancelled, recover_interrupted, sweep_expired
+
+@pytest.fixture
+def database(db):
+    async def make(*apps):
+        await db[ARCHIVE_COLLECTION].create_index("id", unique=True)
+        if apps:
+            await db.applications.insert_many([dict(app) for app in apps])
+        return db
+    return make
+
+
+async def ids(collection, query=None):
+    return sorted(app["id"] for app in await collection.find(query or {}).to_list(None))
+
+
+def test_sweep_moves_only_expired_applications(database, make_application, now):
+    async def run():
+        db = await database(make_application("old", expires=-1), make_application("live", expires=1))
+        moved = await sweep_expired(db, now)
+
+        assert [app["id"] for app in moved] == ["old"]
+        assert moved[0]["is_active"] is False and "swept_by" not in moved[0]
+        assert await ids(db.applications) == ["live"]
+        [archived] = await db[ARCHIVE_COLLECTION].find({}, {"_id": 0}).to_list(None)
+        assert archived["id"] == "old" and archived["archived_at"] == now
+        assert "swept_by" not in archived
+        assert await sweep_expired(db, now) == []
+
+    asyncio.run(run())
+
+
+def test_sweep_works_through_batches(database, make_application, now):
+    async def run():
+        db = await database(*(make_application(f"a{i}", expires=-1) for i in range(7)))
+        moved = await sweep_expired(db, now, batch_size=3)
+
+        assert sorted(app["id"] for app in moved) == [f"a{i}" for i in range(7)]
+        assert await db.applications.count_documents({}) == 0
+        assert await db[ARCHIVE_COLLECTION].count_documents({}) == 7
+
+    asyncio.run(run())
+
+
+def test_applications_claimed_by_another_sweep_are_left_to_it(database, make_application, now):
+    async def run():
+        db = await database(
+            make_application("mine", expires=-1),
+            make_application("theirs", expires=-1, is_active=False, swept_by="other", swept_at=now),
+        )
+        moved = await sweep_expired(db, now)
+
+        assert [app["id"] for app in moved] == ["mine"]
+        assert await ids(db.applications) == ["theirs"]
+
+    asyncio.run(run())
+
+
+def test_cancelled_applications_are_archived(database, make_application, now):
+    async def run():
+        db = await database(
+            make_application("cancelled", expires=48, is_active=False, cancelled_at=now),
+            make_application("live", expires=48),
+        )
+        moved = await archive_cancelled(db, now)
+
+        assert [app["id"] for app in moved] == ["cancelled"]
+        assert await ids(db.applications) == ["live"]
+        assert await ids(db[ARCHIVE_COLLECTION]) == ["cancelled"]
+
+    asyncio.run(run())
+
+
+def test_recover_finishes_an_interrupted_sweep(database, make_application, now):
+    async def run():
+        # Crashed after claiming both and archiving one of them
+        db = await database(
+            make_application("archived", expires=-1, is_active=False, swept_by="crashed"),
+            make_application("claimed", expires=-1, is_active=False, swept_by="crashed"),
+            make_application("live", expires=1),
+        )
+        await db[ARCHIVE_COLLECTION].insert_one({**make_application("archived", expires=-1), "is_active": False})
+
+        assert await recover_interrupted(db, now) == 2
+        assert await ids(db.applications) == ["live"]
+        assert await ids(db[ARCHIVE_COLLECTION]) == ["archived", "claimed"]
+        assert await db[ARCHIVE_COLLECTION].count_documents({"swept_by": {"$exists": True}}) == 0
+        assert await recover_interrupted(db, now) == 0
+
+    asyncio.run(run())
+
+
+def test_recover_leaves_a_running_sweep_alone(database, make_application, now):
+    async def run():
+        db = await database(
+            make_application("stale", expires=-1, is_active=False, swept_by="crashed", swept_at=now - CLAIM_TIMEOUT),
+            make_application(
+                "running", expires=-1, is_active=False, swept_by="busy", swept_at=now - timedelta(seconds=5)
+            ),
+        )
+
+        assert await recover_interrupted(db, now) == 1
+        assert await ids(db.applications) == ["running"]
+        assert await ids(db[ARCHIVE_COLLECTION]) == ["stale"]
+
+    asyncio.run(run())
@@ -0,0 +1,69 @@
+import asyncio
+
+from likes import TRUSTED_LIKES_THRESHOLD, apply_like_delta, reconcile_likes
+
+
+async def seed(db, likes, **users):
+    await db.users.insert_many([{"id": user_id, **counters} for user_id, counters in users.items()])
+    if likes:
+        await db.likes.insert_many([{"target_user_id": target, "liker_id": liker} for target, liker in likes])
+
+
+def test_reconcile_repairs_drifted_counters(db):
+    async def run():
+        likes = [("u1", f"l{i}") for i in range(TRUSTED_LIKES_THRESHOLD)] + [("u2", "l0")]
+        await seed(
+            db, likes,
+            u1={"likes_count": 1, "is_trusted": False},
+            u2={"likes_count": 1, "is_trusted": False},
+            u3={"likes_count": 2, "is_trusted": False},
+        )
+        repaired = await reconcile_likes(db, batch_size=1)
+        users = await db.users.find({}, {"_id": 0}).sort("id").to_list(None)
+        return repaired, users
+
+    repaired, users = asyncio.run(run())
+    assert sorted(repaired) == ["u1", "u3"]
+    assert users == [
+        {"id": "u1", "likes_count": TRUSTED_LIKES_THRESHOLD, "is_trusted": True},
+        {"id": "u2", "likes_count": 1, "is_trusted": False},
+        {"id": "u3", "likes_count": 0, "is_trusted": False},
+    ]
+
+
+class Likes:
+    """db.likes whose recount races with a like toggled on another worker"""
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db.likes
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def count_documents(self, query):
+        count = await self.collection.count_documents(query)
+        # Lands between the recount and the repair's write
+        await self.collection.insert_one({"target_user_id": query["target_user_id"], "liker_id": "late"})
+        await apply_like_delta(self.db, query["target_user_id"], 1)
+        return count
+
+
+class RacingDb:
+    def __init__(self, db):
+        self.users = db.users
+        self.likes = Likes(db)
+
+
+def test_reconcile_does_not_roll_back_a_concurrent_toggle(db):
+    async def run():
+        await seed(db, [("u1", "l0")], u1={"likes_count": 5, "is_trusted": True})
+        await reconcile_likes(RacingDb(db))
+        raced = await db.users.find_one({"id": "u1"}, {"_id": 0})
+        await reconcile_likes(db)
+        return raced, await db.users.find_one({"id": "u1"}, {"_id": 0})
+
+    raced, settled = asyncio.run(run())
+    # Writing the recount of 1 would have lost the late like; the write is skipped instead
+    assert raced["likes_count"] == 6
+    assert settled == {"id": "u1", "likes_count": 2, "is_trusted": False}
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from order_book import OrderBook
+
+
+def ids(apps):
+    return [app["id"] for app in apps]
+
+
+def test_match_returns_corridor_newest_first(make_application, now):
+    book = OrderBook()
+    book.add(make_application("a", created=1))
+    book.add(make_application("b", created=3))
+    book.add(make_application("c", created=2))  # out of order
+    book.add(make_application("x", user_city="Paris"))
+
+    assert ids(book.match("London", "Dubai", now=now)) == ["b", "c", "a"]
+    assert len(book) == 4
+
+
+def test_match_excludes_user_and_pages_before_cursor(make_application, now):
+    book = OrderBook()
+    for i in range(5):
+        book.add(make_application(f"a{i}", user_id=f"u{i % 2}", created=i))
+
+    assert ids(book.match("London", "Dubai", exclude_user_id="u1", now=now)) == ["a4", "a2", "a0"]
+    first = book.match("London", "Dubai", limit=2, now=now)
+    cursor = (first[-1]["created_at"], first[-1]["id"])
+    assert ids(book.match("London", "Dubai", before=cursor, now=now)) == ["a2", "a1", "a0"]
+
+
+def test_same_created_at_orders_by_id(make_application, now):
+    book = OrderBook()
+    for app_id in ("b", "c", "a"):
+        book.add(make_application(app_id))
+
+    assert ids(book.match("London", "Dubai", now=now)) == ["c", "b", "a"]
+    assert ids(book.match("London", "Dubai", before=(now, "c"), now=now)) == ["b", "a"]
+
+
+def test_remove_drops_application_and_empty_corridor(make_application):
+    book = OrderBook()
+    book.add(make_application("a"))
+    version = book.version
+
+    assert book.remove("a")["id"] == "a"
+    assert book.remove("a") is None
+    assert "a" not in book
+    assert book.corridors == {} and book.successors == {} and book.stats == {}
+    assert book.version > version
+
+
+def test_inactive_applications_are_not_added(make_application):
+    book = OrderBook()
+    book.add({**make_application("a"), "is_active": False})
+
+    assert len(book) == 0
+
+
+def test_expire_removes_due_applications(make_application, now):
+    book = OrderBook()
+    book.add(make_application("soon", expires=1))
+    book.add(make_application("later", expires=48))
+
+    assert ids(book.expire(now + timedelta(hours=2))) == ["soon"]
+    assert ids(book.match("London", "Dubai", now=now + timedelta(hours=2))) == ["later"]
+    assert book.expire(now + timedelta(hours=3)) == []
+
+
+def test_renewed_application_outlives_its_old_expiry(make_application, now):
+    book = OrderBook()
+    book.add(make_application("a", expires=1))
+
+    assert book.update_expiry("a", now + timedelta(hours=48))
+    assert book.expire(now + timedelta(hours=2)) == []
+    assert ids(book.expire(now + timedelta(hours=49))) == ["a"]
+    assert not book.update_expiry("a", now + timedelta(hours=96))
+
+
+def test_iteration_survives_changes_between_items(make_application, now):
+    book = OrderBook()
+    for i in range(4):
+        book.add(make_application(f"a{i}", created=i))
+
+    seen = []
+    for app in book.iter_matches("London", "Dubai", now=now):
+        seen.append(app["id"])
+        if app["id"] == "a3":
+            book.remove("a2")
+            book.add(make_application("new", created=10))
+
+    assert seen == ["a3", "a1", "a0"]
+
+
+def test_corridor_summaries_track_totals_and_median(make_application, now):
+    book = OrderBook()
+    for i, amount in enumerate((10.0, 30.0, 20.0)):
+        book.add(make_application(f"a{i}", amount=amount, created=i))
+    book.remove("a1")
+
+    [(corridor, live, newest_at, amounts)] = book.corridor_summaries(now)
+    assert corridor == ("London", "Dubai")
+    assert live == 2
+    assert newest_at == now + timedelta(hours=2)
+    assert amounts == {"USD": (30.0, 15.0)}
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import KEYSET_SORT, decode_cursor, encode_cursor, keyset_filter, merge_newest_first, page
+
+
+def rows(n):
+    # Two rows share each timestamp, so the id tie-break matters
+    return [{"id": f"r{i:02d}", "created_at": datetime(2026, 1, 1, i // 2)} for i in range(n)]
+
+
+def test_cursor_round_trips():
+    row = {"id": "abc|def", "created_at": datetime(2026, 1, 2, 3, 4, 5, 678901)}
+
+    assert decode_cursor(encode_cursor(row)) == (row["created_at"], "abc|def")
+
+
+def test_missing_cursor_decodes_to_none():
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(encode_cursor({"id": "x", "created_at": datetime(2026, 1, 1)})[:-4] + "!!!!")
+    assert error.value.status_code == 400
+
+
+def test_page_emits_cursor_only_when_more_rows_exist():
+    assert page(rows(3), 3)["next_cursor"] is None
+
+    result = page(rows(4), 3)
+    assert [row["id"] for row in result["rows"]] == ["r00", "r01", "r02"]
+    assert decode_cursor(result["next_cursor"]) == (rows(3)[2]["created_at"], "r02")
+
+
+def test_keyset_pages_cover_every_row_once(db):
+    async def walk():
+        collection = db.rows
+        await collection.insert_many(rows(7))
+        seen, cursor = [], None
+        while True:
+            query = keyset_filter(decode_cursor(cursor))
+            result = page(await collection.find(query, {"_id": 0}).sort(KEYSET_SORT).to_list(3), 2)
+            seen.extend(row["id"] for row in result["rows"])
+            cursor = result["next_cursor"]
+            if cursor is None:
+                return seen
+
+    assert asyncio.run(walk()) == [f"r{i:02d}" for i in reversed(range(7))]
+
+
+def test_merge_newest_first_interleaves_sorted_streams():
+    async def stream(items):
+        for item in items:
+            yield item
+
+    async def merged():
+        newest_first = list(reversed(rows(6)))
+        return [row["id"] async for row in merge_newest_first(stream(newest_first[::2]), stream(newest_first[1::2]))]
+
+    assert asyncio.run(merged()) == [f"r{i:02d}" for i in reversed(range(6))]
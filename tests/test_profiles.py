@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import profiles
+import server
+from profiles import PROFILE_COLLECTION, build_profile, record_comment
+from settings import Settings
+
+USER = {"id": "u1", "first_name": "Ann", "last_name": "Lee"}
+
+
+def comment(comment_id, now, name="Bob Old", **fields):
+    return {"id": comment_id, "target_user_id": "u1", "commenter_id": "u2", "commenter_name": name,
+            "content": "hi", "created_at": now, **fields}
+
+
+def test_build_profile_counts_comments(db, now):
+    async def run():
+        await db.users.insert_one(dict(USER))
+        await db.comments.insert_many([comment("c1", now), comment("c2", now)])
+        profile = await build_profile(db, "u1", {"_id": 0})
+        await record_comment(db, comment("c3", now))
+        return profile, await db[PROFILE_COLLECTION].find_one({"user_id": "u1"})
+
+    profile, stored = asyncio.run(run())
+    assert profile["comment_count"] == 2
+    assert profile["user"]["first_name"] == "Ann"
+    assert stored["comment_count"] == 3
+    assert [c["id"] for c in stored["recent_comments"]][0] == "c3"
+
+
+def test_comment_written_during_build_is_not_lost(db, now, monkeypatch):
+    read_comments = profiles._read_comments
+
+    async def read_then_comment(db, user_id):
+        result = await read_comments(db, user_id)
+        if not await db.comments.find_one({"id": "late"}):
+            # Lands after the read but before the profile exists, so record_comment has nothing to update
+            await db.comments.insert_one(comment("late", now))
+            await record_comment(db, comment("late", now))
+        return result
+
+    monkeypatch.setattr(profiles, "_read_comments", read_then_comment)
+
+    async def run():
+        await db.users.insert_one(dict(USER))
+        profile = await build_profile(db, "u1", {"_id": 0})
+        return profile, await db[PROFILE_COLLECTION].count_documents({"user_id": "u1"})
+
+    profile, stored = asyncio.run(run())
+    assert profile["comment_count"] == 1
+    assert [c["id"] for c in profile["recent_comments"]] == ["late"]
+    # The stale document is dropped so the next read rebuilds it
+    assert stored == 0
+
+
+@pytest.fixture
+def api():
+    server.create_app(Settings.from_env({"DB_NAME": "test"}), mongo_client=AsyncMongoMockClient())
+    return server
+
+
+def test_every_comment_path_shows_the_current_author_name(api, now):
+    viewer = api.AuthUser(id="u3", city="London", name="Cat")
+
+    async def run():
+        await api.db.users.insert_many([
+            {**USER, "email": "a@x.com", "city": "London"},
+            {"id": "u2", "first_name": "Bob", "last_name": "New", "email": "b@x.com", "city": "Dubai"},
+        ])
+        await api.db.comments.insert_one(comment("c1", now))
+        short = await api.get_user_profile("u1", comments_limit=10, current_user=viewer)
+        long = await api.get_user_profile("u1", comments_limit=200, current_user=viewer)
+        listed = await api.get_user_comments("u1", cursor=None, limit=None, stream=False, current_user=viewer)
+        return [json.loads(response.body) for response in (short, long, listed)]
+
+    short, long, listed = asyncio.run(run())
+    names = [page["comments"][0]["commenter_name"] for page in (short, long, listed)]
+    assert names == ["Bob New"] * 3
+    # The cached profile keeps the name stored with the comment
+    assert api.profile_cache.get("u1")["recent_comments"][0]["commenter_name"] == "Bob Old"
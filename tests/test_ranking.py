@@ -0,0 +1,78 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from ranking import rank_applications, score, top_k
+
+
+class Rates:
+    """Currency service stand-in: every amount is worth rate of the target currency"""
+
+    def __init__(self, rate=1.0, fail=False):
+        self.rate = rate
+        self.fail = fail
+        self.calls = []
+
+    async def convert(self, amounts, currencies, to):
+        self.calls.append((list(currencies), to))
+        if self.fail:
+            raise ValueError("Unsupported currency")
+        return amounts * self.rate
+
+
+def test_top_k_returns_best_first():
+    scores = np.array([0.2, 0.9, 0.5, 0.9, 0.1])
+
+    assert list(top_k(scores, 2)) == [1, 3]
+    assert list(top_k(scores, 3)) == [1, 3, 2]
+    assert list(top_k(scores, 10)) == [1, 3, 2, 0, 4]
+
+
+def test_score_prefers_close_amounts_trust_and_recency():
+    ones, zeros = np.ones(2), np.zeros(2)
+    by_amount = score(np.array([100.0, 300.0]), 100, zeros, zeros, zeros)
+    by_trust = score(ones, None, np.array([1.0, 0.0]), np.array([20.0, 0.0]), zeros)
+    by_age = score(ones, None, zeros, zeros, np.array([0.0, 7.0]))
+
+    assert by_amount[0] - by_amount[1] == pytest.approx(0.5 * 2 / 3)
+    assert by_trust[0] - by_trust[1] == pytest.approx(0.3)
+    assert by_age[0] - by_age[1] == pytest.approx(0.1)
+
+
+def test_rank_applications_orders_by_score(make_application, now):
+    apps = [
+        make_application("far", user_id="u1", amount=1000.0, created=-1),
+        make_application("close", user_id="u2", amount=110.0, created=-1),
+        make_application("unknown_owner", user_id="gone", amount=100.0),
+    ]
+    users = {"u1": {"is_trusted": True, "likes_count": 5}, "u2": {"likes_count": 0}}
+    rates = Rates()
+    ranked = asyncio.run(rank_applications(apps, users, rates, now, limit=5, amount=100.0, currency="EUR"))
+
+    assert [app["id"] for _, app in ranked] == ["close", "far"]
+    assert ranked[0][0] > ranked[1][0]
+    assert rates.calls == [(["USD", "USD"], "EUR")]
+
+
+def test_rank_applications_converts_to_the_callers_currency(make_application, now):
+    apps = [make_application("a", user_id="u1", amount=100.0), make_application("b", user_id="u2", amount=50.0)]
+    users = {"u1": {}, "u2": {}}
+
+    # 50 USD is worth 100 of the caller's currency at 2x
+    ranked = asyncio.run(rank_applications(apps, users, Rates(rate=2.0), now, limit=1, amount=100.0, currency="AED"))
+    assert [app["id"] for _, app in ranked] == ["b"]
+
+
+def test_rank_applications_falls_back_to_unconverted_amounts(make_application, now):
+    apps = [make_application("a", amount=100.0), make_application("b", amount=500.0)]
+    ranked = asyncio.run(rank_applications(apps, {"u1": {}}, Rates(fail=True), now, limit=2, amount=100.0))
+
+    assert [app["id"] for _, app in ranked] == ["a", "b"]
+
+
+def test_rank_applications_without_amount_skips_conversion(make_application, now):
+    rates = Rates()
+    assert asyncio.run(rank_applications([], {}, rates, now, limit=5)) == []
+    asyncio.run(rank_applications([make_application("a")], {"u1": {}}, rates, now, limit=5))
+    assert rates.calls == []
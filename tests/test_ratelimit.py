@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+import ratelimit
+from ratelimit import InMemoryRateLimitStore, MongoRateLimitStore, RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+
+def hits(limiter, key, n):
+    async def run():
+        return [await limiter.hit(key) for _ in range(n)]
+    return asyncio.run(run())
+
+
+def test_bucket_allows_capacity_then_reports_retry_after(clock):
+    limiter = RateLimiter(InMemoryRateLimitStore(), "search", capacity=3, refill_per_second=0.5)
+
+    assert hits(limiter, "u1", 4) == [None, None, None, pytest.approx(2.0)]
+    assert hits(limiter, "u2", 1) == [None]
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    limiter = RateLimiter(InMemoryRateLimitStore(), "search", capacity=2, refill_per_second=1)
+    hits(limiter, "u1", 2)
+
+    clock.now += 1
+    assert hits(limiter, "u1", 2) == [None, pytest.approx(1.0)]
+    clock.now += 60
+    assert hits(limiter, "u1", 3)[:2] == [None, None]
+
+
+def test_least_recently_used_buckets_are_dropped(clock):
+    store = InMemoryRateLimitStore(max_keys=2)
+    limiter = RateLimiter(store, "auth", capacity=1, refill_per_second=0.1)
+    for key in ("a", "b", "a", "c"):
+        hits(limiter, key, 1)
+
+    assert list(store.buckets) == ["auth:a", "auth:c"]
+
+
+def test_mongo_buckets_are_shared(db):
+    limiters = [RateLimiter(MongoRateLimitStore(db), "auth", capacity=2, refill_per_second=0.001) for _ in range(2)]
+
+    async def run():
+        return [await limiter.hit("1.2.3.4") for limiter in limiters + limiters]
+    results = asyncio.run(run())
+
+    assert results[:2] == [None, None]
+    assert results[2] > 0 and results[3] > 0
@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from shared_cache import InMemorySharedCache, MongoSharedCache
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def cache(request, db):
+    return InMemorySharedCache() if request.param == "memory" else MongoSharedCache(db)
+
+
+def test_get_set_delete(cache):
+    async def run():
+        await cache.set("k", {"rates": [1, 2]}, 60)
+        stored = await cache.get("k")
+        await cache.delete("k")
+        return stored, await cache.get("k"), await cache.get("missing")
+
+    assert asyncio.run(run()) == ({"rates": [1, 2]}, None, None)
+
+
+def test_add_only_sets_an_absent_key(cache):
+    async def run():
+        first = await cache.add("lock", "a", 60)
+        second = await cache.add("lock", "b", 60)
+        return first, second, await cache.get("lock")
+
+    assert asyncio.run(run()) == (True, False, "a")
+
+
+def test_mongo_add_replaces_an_expired_entry(db):
+    cache = MongoSharedCache(db)
+
+    async def run():
+        await cache.set("lock", "a", 60)
+        # Expired, but not yet removed by the TTL index
+        await db.shared_cache.update_one({"_id": "lock"}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+        expired = await cache.get("lock")
+        return expired, await cache.add("lock", "b", 60), await cache.get("lock")
+
+    assert asyncio.run(run()) == (None, True, "b")